@@ -0,0 +1,118 @@
+"""
+Benchmark of plugin invocations started at the same time (e.g. folder refresh plus skin widget)
+
+Every invocation is a separate process sharing addon data with the others, but with empty memory
+storage, so each of them needs login and program. Invocations wait for a common start time and
+then open the same folder against the stand-in server. Reports requests the server received per
+endpoint and the slowest invocation. With --no-coordination login lock and program fetch
+coalescing are disabled for comparison.
+
+Usage (from repository root):
+    python -m benchmarks.bench_concurrent --processes 4 --latency 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import shutil
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+START_DELAY = 1.5  # seconds for all children to import the addon before the common start
+
+
+def run_child(url, login_provider_url, data_root, start_at, coordination):
+    """Body of the child process: open folder at start_at and print duration as JSON"""
+    from benchmarks import kodi_shim
+    runtime = kodi_shim.KodiRuntime(data_root=data_root)
+    from benchmarks.standin_server import redirect_user_data
+    redirect_user_data(url)
+    runtime.import_default()
+    from resources.lib import tipsport_stream_generator
+    tipsport_stream_generator.LOGIN_PROVIDER_URL = login_provider_url
+    if not coordination:
+        disable_coordination(tipsport_stream_generator)
+    time.sleep(max(0, start_at - time.time()))
+    start = time.perf_counter()
+    record = runtime.invoke({'mode': 'folder'}, 'CZ_TIPSPORT')
+    print(json.dumps({'ms': round((time.perf_counter() - start) * 1000, 2), 'items': len(record.items),
+                      'dialogs': len(record.dialogs)}))
+
+
+def disable_coordination(module):
+    class NoLock:
+        waited = False
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+    module.FileLock = NoLock
+    module.coalesce = lambda lock_path, fetch, get_shared_result, timeout=None: fetch()
+
+
+def measure(processes, latency, coordination):
+    from benchmarks.standin_server import StandInServer
+    data_root = tempfile.mkdtemp(prefix='kodi_shim_')
+    try:
+        with StandInServer(latency=latency / 1000.0) as server:
+            start_at = time.time() + START_DELAY
+            command = [sys.executable, '-m', 'benchmarks.bench_concurrent', '--child', server.url,
+                       server.login_provider_url, data_root, str(start_at)]
+            if not coordination:
+                command.append('--no-coordination')
+            children = [subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True, cwd=ROOT)
+                        for _ in range(processes)]
+            results = [json.loads(child.communicate()[0].strip().splitlines()[-1]) for child in children]
+            requests = dict(server.requests)
+    finally:
+        shutil.rmtree(data_root, ignore_errors=True)
+    return {
+        'coordination': coordination,
+        'processes': processes,
+        'max_ms': max(result['ms'] for result in results),
+        'items': [result['items'] for result in results],
+        'requests': sum(requests.values()),
+        'by_endpoint': requests
+    }
+
+
+def format_report(results):
+    lines = []
+    for result in results:
+        lines.append('coordination: {0}, processes: {1}, slowest: {2} ms, requests: {3}, items: {4}'.format(
+            'on' if result['coordination'] else 'off', result['processes'], result['max_ms'], result['requests'],
+            result['items']))
+        for endpoint, count in sorted(result['by_endpoint'].items()):
+            lines.append('    {0:<60}{1:>4}'.format(endpoint, count))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4, help='invocations started at once')
+    parser.add_argument('--latency', type=float, default=50, help='injected latency of every response in ms')
+    parser.add_argument('--no-coordination', action='store_true', help='disable login lock and request coalescing')
+    parser.add_argument('--compare', action='store_true', help='run with and without coordination')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--child', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        url, login_provider_url, data_root, start_at = args.child
+        return run_child(url, login_provider_url, data_root, float(start_at), not args.no_coordination)
+    modes = [True, False] if args.compare else [not args.no_coordination]
+    results = [measure(args.processes, args.latency, coordination) for coordination in modes]
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
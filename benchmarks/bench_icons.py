@@ -0,0 +1,112 @@
+"""
+Benchmark of match icon generation
+
+Generates icons of all pairings of the first --teams teams of KodiHelper.LOGOS (a full day of
+program has at most a few dozen of them) into a temporary directory, once by pasting freshly
+opened images (how icons were generated before IconCompositor), once by KodiHelper.generate_icon
+and once by IconPipeline. 'listing ms' is how long a listing waits for icons: listings used to generate
+them one by one, with IconPipeline they are generated in background and the listing does not wait.
+Requires PIL, NumPy is used by the compositor when it is installed.
+
+Usage (from repository root):
+    python -m benchmarks.bench_icons --teams 8
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks import kodi_shim  # noqa: E402
+
+
+def paste_icon(kodi_helper, name_1, name_2, path):
+    """Icon generation before IconCompositor (baseline)"""
+    from PIL import Image
+    images = list(map(Image.open, [kodi_helper.get_logo('vs.png'),
+                                   kodi_helper.get_logo(name_1 + '.png'),
+                                   kodi_helper.get_logo(name_2 + '.png')]))
+    new_img = Image.new('RGB', (images[0].width, images[0].height))
+    new_img.putalpha(0)
+    new_img.paste(images[1], (0, 0), images[1])
+    new_img.paste(images[2], (int(images[0].width / 2), 0), images[2])
+    new_img.paste(images[0], (0, 0), images[0])
+    new_img.save(path)
+    return True
+
+
+def measure(name, generate, kodi_helper, pairs):
+    directory = tempfile.mkdtemp(prefix='tipsport_icons_')
+    try:
+        start = time.perf_counter()
+        generated = sum(1 for first, second in pairs
+                        if generate(kodi_helper, first, second, os.path.join(directory, first + '_VS_' + second + '.png')))
+        duration = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return create_result(name, generated, duration, duration, pairs)
+
+
+def measure_pipeline(kodi_helper, pairs, workers):
+    from resources.lib.icon_pipeline import IconPipeline
+    from resources.lib.kodi_helper import LOGOS
+    teams = {logo: team for team, logo in LOGOS.items()}
+    matches = [SimpleNamespace(first_team=teams[first], second_team=teams[second], is_competition_with_logo=True)
+               for first, second in pairs]
+    directory = tempfile.mkdtemp(prefix='tipsport_icons_')
+    kodi_helper.tmp_path, kodi_helper._ready_icons = directory, None
+    try:
+        start = time.perf_counter()
+        pipeline = IconPipeline(kodi_helper, workers, time_limit=3600)  # measure all icons
+        pipeline.start(matches)
+        listing = time.perf_counter() - start
+        generated = pipeline.wait()
+        duration = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return create_result('pipeline ({0})'.format(workers), generated, duration, listing, pairs)
+
+
+def create_result(name, generated, duration, listing, pairs):
+    return {'method': name, 'icons': generated, 'ms': round(duration * 1000, 1),
+            'ms_per_icon': round(duration * 1000 / max(1, len(pairs)), 2), 'listing_ms': round(listing * 1000, 1)}
+
+
+def format_report(results):
+    lines = ['{0:<20}{1:>8}{2:>12}{3:>14}{4:>12}'.format('method', 'icons', 'total ms', 'ms per icon', 'listing ms')]
+    for result in results:
+        lines.append('{method:<20}{icons:>8}{ms:>12}{ms_per_icon:>14}{listing_ms:>12}'.format(**result))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teams', type=int, default=8, help='number of teams, all their pairings are generated')
+    parser.add_argument('--workers', type=int, default=None, help='threads of IconPipeline (default ICON_WORKERS)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+    runtime = kodi_shim.KodiRuntime(settings={'generate_logos': 'true'})
+    try:
+        from resources.lib.kodi_helper import KodiHelper, LOGOS
+        from resources.lib import icon_compositor, icon_pipeline
+        kodi_helper = KodiHelper(plugin_handle=1, args='', base_url='plugin://{0}/'.format(kodi_shim.ADDON_ID))
+        teams = sorted(set(LOGOS.values()))[:args.teams]
+        pairs = [(first, second) for first in teams for second in teams if first != second]
+        results = [
+            measure('paste', paste_icon, kodi_helper, pairs),
+            measure('compositor ({0})'.format('numpy' if icon_compositor.is_numpy_available() else 'pil'),
+                    KodiHelper.generate_icon, kodi_helper, pairs),
+            measure_pipeline(kodi_helper, pairs, args.workers or icon_pipeline.ICON_WORKERS)
+        ]
+    finally:
+        runtime.cleanup()
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
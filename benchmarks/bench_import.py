@@ -0,0 +1,116 @@
+"""
+Cold-start benchmark of default.py per plugin mode
+
+Every Kodi click runs default.py in a fresh interpreter, so import time is paid on every click.
+For every mode a new Python process imports default.py and runs main() once. The Tipsport
+snapshot in MemStorage is prepared beforehand (fresh program, valid session, resolved stream),
+so no mode needs the network and the measured time is mostly imports (only the tiny user_data
+module is imported before measurement to point the addon to the stopped stand-in server).
+Reports wall-clock time of the invocation, number of newly imported modules and which
+heavy modules were loaded.
+
+Usage (from repository root):
+    python -m benchmarks.bench_import --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+MATCH_URL = '/kladno-sparta-praha/1000'
+INVOCATIONS = {
+    'notification': ({'mode': 'notification', 'title': 'Kladno-Sparta Praha', 'message': 'Not started'}, None),
+    'root': ({}, None),
+    'folder': ({'mode': 'folder'}, 'CZ_TIPSPORT'),
+    'play': ({'mode': 'play', 'url': MATCH_URL, 'name': 'Kladno-Sparta Praha', 'start_time': '00:00'}, None)
+}
+HEAVY_MODULES = ['requests', 'urllib3', 'PIL', 'numpy', 'resources.lib.tipsport_stream_generator',
+                 'resources.lib.stream_strategy_factory', 'resources.lib.match_catalog']
+
+
+def prepare_storage():
+    """
+    Run the addon against the stand-in server
+    Return url of the server and MemStorage content the addon left behind
+    """
+    from benchmarks import kodi_shim
+    from benchmarks.standin_server import StandInServer, redirect_addon
+    runtime = kodi_shim.KodiRuntime()
+    try:
+        with StandInServer() as server:
+            redirect_addon(server)
+            for query, folder in INVOCATIONS.values():
+                runtime.invoke(query, folder)
+            return server.url, dict(runtime.properties)
+    finally:
+        runtime.cleanup()
+
+
+def run_child(mode):
+    """Body of the child process: invoke one mode and print measurement as JSON"""
+    url, properties = json.loads(sys.stdin.read())
+    from benchmarks import kodi_shim
+    from benchmarks.standin_server import redirect_user_data
+    runtime = kodi_shim.KodiRuntime()
+    redirect_user_data(url)  # cached program is keyed by url of the (already stopped) stand-in server
+    runtime.properties.update(properties)
+    query, folder = INVOCATIONS[mode]
+    modules_before = set(sys.modules)
+    start = time.perf_counter()
+    record = runtime.invoke(query, folder)
+    duration = time.perf_counter() - start
+    loaded = set(sys.modules) - modules_before
+    runtime.cleanup()
+    print(json.dumps({
+        'mode': mode,
+        'ms': round(duration * 1000, 2),
+        'modules': len(loaded),
+        'heavy': [name for name in HEAVY_MODULES if name in loaded],
+        'dialogs': len(record.dialogs)
+    }))
+
+
+def measure(mode, prepared, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_import', '--child', mode],
+                                input=json.dumps(prepared),
+                                stdout=subprocess.PIPE,
+                                universal_newlines=True,
+                                check=True,
+                                cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    durations = sorted(result['ms'] for result in results)
+    result = dict(results[0], ms=durations[len(durations) // 2], min_ms=durations[0])
+    return result
+
+
+def format_report(results):
+    lines = ['{0:<14}{1:>10}{2:>10}{3:>10}  {4}'.format('mode', 'p50 ms', 'min ms', 'modules', 'heavy modules')]
+    for result in results:
+        lines.append('{mode:<14}{ms:>10}{min_ms:>10}{modules:>10}  {0}'.format(', '.join(result['heavy']) or '-',
+                                                                            **result))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=sorted(INVOCATIONS), default=list(INVOCATIONS))
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per mode (median is reported)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--child', choices=sorted(INVOCATIONS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return run_child(args.child)
+    prepared = prepare_storage()
+    results = [measure(mode, prepared, args.runs) for mode in args.modes]
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Scaling benchmark of the match listing path
+
+For every program size measures JSON parse, Match construction, sorting and
+the folder bucketing used by show_all_matches (matches are created only when
+their bucket is listed). Reports time and peak memory per stage.
+
+Usage (from repository root):
+    python -m benchmarks.bench_list_matches --sizes 100 1000 10000 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks import kodi_shim  # noqa: E402
+
+kodi_shim.install()
+from benchmarks.program_generator import generate_program_body  # noqa: E402
+from resources.lib.match_catalog import MatchCatalog, LEAGUE_BY_COMPETITION, ICE_HOCKEY_SPORT_ID  # noqa: E402
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+def measure(operation, *args):
+    """Return (result, seconds, peak bytes) of operation"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = operation(*args)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak
+
+
+def create_matches(data):
+    return [
+        MatchCatalog._create_match(match, LEAGUE_BY_COMPETITION.get(match['competition'])
+                                   if sports['id'] == ICE_HOCKEY_SPORT_ID else None) for sports in data['program']
+        for matches_in_timespan in sports['matchesByTimespans'] for match in matches_in_timespan
+    ]
+
+
+def sort_matches(matches):
+    return sorted(matches, key=lambda match: match.match_time)
+
+
+def browse_folder_levels(catalog):
+    """Sport and competition folder levels of show_all_matches"""
+    return sum(len(catalog.get_competitions(sport)) for sport in catalog.get_sports())
+
+
+def browse_folders(catalog):
+    """Every folder level of show_all_matches"""
+    count = 0
+    for sport in catalog.get_sports():
+        for competition in catalog.get_competitions(sport):
+            count += len(catalog.get_matches(sport, competition))
+    return count
+
+
+def run(size):
+    body = generate_program_body(size)
+    stages = []
+    data, duration, peak = measure(json.loads, body)
+    stages.append(('parse', duration, peak))
+    matches, duration, peak = measure(create_matches, data)
+    stages.append(('create Match', duration, peak))
+    _, duration, peak = measure(sort_matches, matches)
+    stages.append(('sort', duration, peak))
+    catalog, duration, peak = measure(MatchCatalog.from_program, data)
+    stages.append(('bucket (catalog)', duration, peak))
+    _, duration, peak = measure(browse_folder_levels, catalog)
+    stages.append(('folder levels', duration, peak))
+    _, duration, peak = measure(browse_folders, catalog)
+    stages.append(('browse folders', duration, peak))
+    return [{
+        'matches': size,
+        'body_bytes': len(body),
+        'stage': stage,
+        'ms': round(duration * 1000, 2),
+        'peak_kib': round(peak / 1024.0, 1)
+    } for stage, duration, peak in stages]
+
+
+def format_report(results):
+    lines = ['{0:>8}{1:>22}{2:>12}{3:>14}'.format('matches', 'stage', 'ms', 'peak KiB')]
+    for result in results:
+        lines.append('{matches:>8}{stage:>22}{ms:>12}{peak_kib:>14}'.format(**result))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+    results = [result for size in args.sizes for result in run(size)]
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
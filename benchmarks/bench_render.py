@@ -0,0 +1,73 @@
+"""
+Benchmark of rendering a listing of matches into Kodi
+
+Builds list items of N generated matches the way default.py does and reports time per listing
+and calls into Kodi API. In real Kodi every call crosses from Python into Kodi, --api-delay
+simulates its cost (every stand-in API call sleeps that long).
+
+Usage (from repository root):
+    python -m benchmarks.bench_render --sizes 50 200 1000 --api-delay 0.2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks import kodi_shim  # noqa: E402
+from benchmarks.program_generator import generate_program  # noqa: E402
+
+DEFAULT_SIZES = [50, 200, 1000]
+
+
+def measure(runtime, size, runs):
+    from resources.lib.kodi_helper import KodiHelper
+    from resources.lib.match_catalog import MatchCatalog
+    default = runtime.import_default()
+    matches = MatchCatalog.from_program(generate_program(size)).get_matches()
+    durations = []
+    for _ in range(runs):
+        kodi_shim.reset_api_calls()
+        start = time.perf_counter()
+        kodi_helper = KodiHelper(plugin_handle=1, args='', base_url='plugin://{0}/'.format(kodi_shim.ADDON_ID))
+        default.add_match_items(kodi_helper, matches)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    api_calls = kodi_shim.get_api_calls()
+    return {
+        'matches': len(matches),
+        'p50_ms': round(durations[len(durations) // 2] * 1000, 2),
+        'api_calls': sum(api_calls.values()),
+        'by_api': api_calls
+    }
+
+
+def format_report(results, api_delay_ms):
+    lines = ['Simulated Kodi API call: {0} ms'.format(api_delay_ms),
+             '{0:>10}{1:>12}{2:>12}  {3}'.format('matches', 'p50 ms', 'api calls', 'by api')]
+    for result in results:
+        lines.append('{matches:>10}{p50_ms:>12}{api_calls:>12}  {0}'.format(
+            ', '.join('{0} {1}'.format(name, count) for name, count in sorted(result['by_api'].items())), **result))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='numbers of matches')
+    parser.add_argument('--api-delay', type=float, default=0.0, help='cost of one Kodi API call in ms')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+    runtime = kodi_shim.KodiRuntime()
+    kodi_shim.set_api_delay(args.api_delay / 1000.0)
+    try:
+        results = [measure(runtime, size, args.runs) for size in args.sizes]
+    finally:
+        runtime.cleanup()
+    print(json.dumps(results, indent=2) if args.json else format_report(results, args.api_delay))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+End to end benchmark of Tipsport class against local stand-in server
+
+Measures Tipsport.login, get_list_matches and get_stream and reports latency
+percentiles and number of HTTP requests per operation. The last get_stream resolves another
+match of the same competition, so probes are ordered by statistics of the first one.
+
+Usage (from repository root):
+    python -m benchmarks.bench_tipsport --latency 50 --iterations 20
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks import kodi_shim  # noqa: E402
+
+kodi_shim.install()
+from benchmarks.standin_server import StandInServer, create_program, redirect_addon  # noqa: E402
+from benchmarks.program_generator import generate_program  # noqa: E402
+from resources.lib.tipsport_stream_generator import Tipsport  # noqa: E402
+from resources.lib.user_data import UserData  # noqa: E402
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class OperationStats:
+    def __init__(self, name):
+        self.name = name
+        self.durations = []
+        self.request_counts = []
+
+    def add(self, duration, request_count):
+        self.durations.append(duration)
+        self.request_counts.append(request_count)
+
+    def to_dict(self):
+        return {
+            'operation': self.name,
+            'iterations': len(self.durations),
+            'p50_ms': round(percentile(self.durations, 50) * 1000, 2),
+            'p95_ms': round(percentile(self.durations, 95) * 1000, 2),
+            'requests_min': min(self.request_counts),
+            'requests_max': max(self.request_counts),
+            'requests_avg': round(sum(self.request_counts) / float(len(self.request_counts)), 2)
+        }
+
+
+class TipsportBench:
+    def __init__(self, server, program_cache_ttl=0, program_days=1):
+        self.server = server
+        self.program_cache_ttl = program_cache_ttl
+        self.program_days = program_days
+        self.stats = {}
+        self._data_paths = []
+        redirect_addon(server)
+
+    def create_tipsport(self, data_path=None):
+        user_data = UserData('bench', 'bench', 'tipsport.cz')
+        if data_path is None:
+            data_path = tempfile.mkdtemp(prefix='tipsport_bench_')
+            self._data_paths.append(data_path)
+        return Tipsport(kodi_shim.BenchKodiHelper(user_data, data_path, self.program_cache_ttl, self.program_days))
+
+    def measure(self, name, operation):
+        self.server.reset_counts()
+        start = time.perf_counter()
+        result = operation()
+        duration = time.perf_counter() - start
+        self.stats.setdefault(name, OperationStats(name)).add(duration, self.server.get_request_count())
+        return result
+
+    def run(self, iterations):
+        for _ in range(iterations):
+            tipsport = self.create_tipsport()
+            self.measure('login', tipsport.login)
+            self.measure('login (stored descriptor)', self.create_tipsport(self._data_paths[-1]).login)
+            matches = self.measure('get_list_matches', lambda: tipsport.get_list_matches('CZ_TIPSPORT'))
+            self.measure('get_list_matches (again)', lambda: tipsport.get_list_matches('CZ_TIPSPORT'))
+            if not matches:
+                continue
+            self.measure('get_stream', lambda: tipsport.get_stream(matches[0].url, matches[0].competition))
+            self.measure('get_stream (again)', lambda: tipsport.get_stream(matches[0].url, matches[0].competition))
+            match = matches[-1]
+            self.measure('get_stream (known competition)', lambda: tipsport.get_stream(match.url, match.competition))
+        return [stats.to_dict() for stats in self.stats.values()]
+
+    def cleanup(self):
+        for data_path in self._data_paths:
+            shutil.rmtree(data_path, ignore_errors=True)
+
+
+def format_report(results, latency_ms):
+    lines = ['Injected latency: {0} ms'.format(latency_ms),
+             '{0:<32}{1:>10}{2:>10}{3:>12}'.format('operation', 'p50 ms', 'p95 ms', 'requests')]
+    for result in results:
+        lines.append('{operation:<32}{p50_ms:>10}{p95_ms:>10}{requests_avg:>12}'.format(**result))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=20, help='injected latency of every response in ms')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--program-cache-ttl', type=int, default=0, help='program cache ttl in seconds')
+    parser.add_argument('--matches', type=int, default=None, help='number of matches in generated program')
+    parser.add_argument('--program-days', type=int, default=1, help='number of days of program to load')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+    program = create_program() if args.matches is None else generate_program(args.matches)
+    programs_by_day = {} if args.matches is None else {
+        day: generate_program(args.matches, seed=day, first_id=1000000 * (day + 1))
+        for day in range(1, args.program_days)
+    }
+    with StandInServer(latency=args.latency / 1000.0, program=program, programs_by_day=programs_by_day) as server:
+        bench = TipsportBench(server, args.program_cache_ttl, args.program_days)
+        try:
+            results = bench.run(args.iterations)
+        finally:
+            bench.cleanup()
+    if args.json:
+        print(json.dumps({'latency_ms': args.latency, 'results': results}, indent=2))
+    else:
+        print(format_report(results, args.latency))
+    return results
+
+
+if __name__ == '__main__':
+    main()
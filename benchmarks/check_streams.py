@@ -0,0 +1,176 @@
+"""
+Stream health check: resolve streams of all enabled matches in parallel
+
+Smoke check after changes on Tipsport side. Matches are resolved by a bounded pool of workers,
+new resolutions are started at most --rate times per second. Report contains strategy, latency
+and exception class of every match and overall throughput.
+Streams are resolved by StreamStrategyFactory directly, so nothing is served from stream cache.
+
+Usage (from repository root):
+    python -m benchmarks.check_streams --standin --latency 50      # local stand-in server
+    python -m benchmarks.check_streams --username me --site tipsport.sk --workers 2 --rate 1
+"""
+import argparse
+import getpass
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks import kodi_shim  # noqa: E402
+
+kodi_shim.install()
+from benchmarks.bench_tipsport import percentile  # noqa: E402
+from benchmarks.program_generator import generate_program  # noqa: E402
+from benchmarks.standin_server import StandInServer, create_program, redirect_addon  # noqa: E402
+from resources.lib.tipsport_stream_generator import Tipsport  # noqa: E402
+from resources.lib.site import Site  # noqa: E402
+from resources.lib.user_data import UserData  # noqa: E402
+from resources.lib.utils import get_stream_number  # noqa: E402
+
+
+class RateLimiter:
+    """Allow at most `rate` calls of wait() per second (shared by all workers)"""
+    def __init__(self, rate):
+        self._interval = 1.0 / rate if rate > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class StreamChecker:
+    def __init__(self, tipsport, workers=4, rate=5.0):
+        self.tipsport = tipsport
+        self.workers = workers
+        self.rate_limiter = RateLimiter(rate)
+
+    def get_matches(self, competition=None, include_disabled=False):
+        self.tipsport.login()
+        matches = self.tipsport.get_list_matches(competition)
+        return [match for match in matches if include_disabled or match.is_stream_enabled()]
+
+    def check(self, matches):
+        """Return (results per match, wall-clock duration in seconds)"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self.check_match, matches))
+        return results, time.perf_counter() - start
+
+    def check_match(self, match):
+        self.rate_limiter.wait()
+        factory = self.tipsport.stream_strategy_factory
+        result = {
+            'name': match.name,
+            'competition': match.competition,
+            'url': match.url,
+            'strategy': None,
+            'format': None,
+            'link': None,
+            'ok': False,
+            'error': None,
+            'message': None
+        }
+        start = time.perf_counter()
+        try:
+            strategy = factory.get_stream_strategy(match.url, match.competition)
+            result['strategy'] = type(strategy).__name__
+            result['format'] = factory.get_hints().get(get_stream_number(match.url))
+            stream = strategy.get_stream()
+            if stream is not None:
+                result['link'] = stream.get_link()
+                result['ok'] = True
+        except Exception as e:
+            result['error'] = type(e).__name__
+            result['message'] = str(e)
+        result['ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+
+def summarize(results, duration):
+    durations = [result['ms'] for result in results] or [0]
+    errors = {}
+    for result in results:
+        if not result['ok']:
+            error = result['error'] or 'NoStream'
+            errors[error] = errors.get(error, 0) + 1
+    return {
+        'matches': len(results),
+        'ok': sum(1 for result in results if result['ok']),
+        'failed': sum(1 for result in results if not result['ok']),
+        'errors': errors,
+        'duration_s': round(duration, 3),
+        'throughput_per_s': round(len(results) / duration, 2) if duration > 0 else 0,
+        'p50_ms': percentile(durations, 50),
+        'p95_ms': percentile(durations, 95)
+    }
+
+
+def format_report(results, summary):
+    lines = ['{0:<40}{1:<24}{2:<26}{3:>10}  {4}'.format('match', 'competition', 'strategy', 'ms', 'error')]
+    for result in results:
+        lines.append('{0:<40}{1:<24}{2:<26}{3:>10}  {4}'.format(
+            result['name'][:39], (result['competition'] or '')[:23], result['strategy'] or '-', result['ms'],
+            '' if result['ok'] else result['error'] or 'NoStream'))
+    lines.append('')
+    lines.append('{ok}/{matches} streams resolved in {duration_s} s ({throughput_per_s} matches/s), '
+                 'p50 {p50_ms} ms, p95 {p95_ms} ms'.format(**summary))
+    for error, count in sorted(summary['errors'].items()):
+        lines.append('  {0}: {1}'.format(error, count))
+    return '\n'.join(lines)
+
+
+def run(args, user_data):
+    data_path = tempfile.mkdtemp(prefix='tipsport_check_')
+    try:
+        tipsport = Tipsport(kodi_shim.BenchKodiHelper(user_data, data_path, program_days=args.program_days))
+        checker = StreamChecker(tipsport, args.workers, args.rate)
+        matches = checker.get_matches(args.competition, args.all)
+        results, duration = checker.check(matches)
+        return results, summarize(results, duration)
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--standin', action='store_true', help='check streams of local stand-in server')
+    parser.add_argument('--latency', type=float, default=20, help='latency of stand-in server in ms')
+    parser.add_argument('--matches', type=int, default=None, help='number of matches of stand-in server')
+    parser.add_argument('--username', help='Tipsport username (asked for if missing)')
+    parser.add_argument('--site', default=Site.CZ, choices=[Site.CZ, Site.SK])
+    parser.add_argument('--competition', help='check only matches of this competition folder (e.g. CZ_TIPSPORT)')
+    parser.add_argument('--all', action='store_true', help='check also matches whose stream is not enabled yet')
+    parser.add_argument('--program-days', type=int, default=1, help='number of days of program to load')
+    parser.add_argument('--workers', type=int, default=4, help='matches resolved at once')
+    parser.add_argument('--rate', type=float, default=5, help='max resolutions started per second (0 = unlimited)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+    if args.standin:
+        program = create_program() if args.matches is None else generate_program(args.matches)
+        with StandInServer(latency=args.latency / 1000.0, program=program) as server:
+            redirect_addon(server)
+            results, summary = run(args, UserData('check', 'check', Site.CZ))
+    else:
+        username = args.username or input('username: ')
+        results, summary = run(args, UserData(username, getpass.getpass('password: '), args.site))
+    if args.json:
+        print(json.dumps({'summary': summary, 'results': results}, indent=2, ensure_ascii=False))
+    else:
+        print(format_report(results, summary))
+    return summary['failed'] == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,363 @@
+"""
+In-process stand-ins for Kodi modules so the addon can run outside Kodi
+
+Call install() (or create KodiRuntime) before importing anything from resources.lib or default.py.
+Stand-ins record what the addon does (directory items, resolved urls, dialogs, log)
+so benchmarks and profilers can inspect it.
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import types
+from collections import Counter
+
+ADDON_ID = 'plugin.video.tipsport.elh'
+ADDON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_SETTINGS = {
+    'site': '0',
+    'username': 'bench',
+    'password': 'bench',
+    'generate_logos': 'false',
+    'send_crash_reports': 'false',
+    'show_all_matches': 'true',
+    'folder_structure_all_matches': 'true',
+    'program_cache_ttl': '2',
+    'program_days': '1',
+    'background_service': 'false',
+    'trace': 'false'
+}
+
+LOG = []
+
+
+class Record:
+    """Everything the addon handed over to Kodi during one invocation"""
+    def __init__(self):
+        self.items = []
+        self.resolved = []
+        self.dialogs = []
+        self.content = None
+        self.end_of_directory = False
+
+    def to_dict(self):
+        return {
+            'items': len(self.items),
+            'resolved': [listitem.path for _, listitem in self.resolved],
+            'dialogs': self.dialogs,
+            'content': self.content,
+            'end_of_directory': self.end_of_directory
+        }
+
+
+class _State:
+    record = Record()
+    settings = dict(DEFAULT_SETTINGS)
+    properties = {}
+    data_root = None
+    verbose = False
+    strings = None
+    api_delay = 0.0
+    api_calls = Counter()
+
+
+def set_api_delay(seconds):
+    """Simulate cost of a call from the addon into Kodi (every stand-in API call sleeps that long)"""
+    _State.api_delay = seconds
+
+
+def get_api_calls():
+    """Calls into Kodi API made since reset_api_calls() by name"""
+    return dict(_State.api_calls)
+
+
+def reset_api_calls():
+    _State.api_calls.clear()
+
+
+def _api_call(name):
+    _State.api_calls[name] += 1
+    if _State.api_delay:
+        time.sleep(_State.api_delay)
+
+
+def _log(message, level=0):
+    LOG.append(message)
+    if _State.verbose:
+        print(message, file=sys.stderr)
+
+
+def _load_strings():
+    if _State.strings is None:
+        _State.strings = {}
+        po_path = os.path.join(ADDON_PATH, 'resources', 'language', 'resource.language.en_gb', 'strings.po')
+        with open(po_path, encoding='utf-8') as f:
+            content = f.read()
+        for string_id, text in re.findall(r'msgctxt "#(\d+)"\nmsgid "(.*)"', content):
+            _State.strings[int(string_id)] = text
+    return _State.strings
+
+
+def _translate_path(path):
+    home_addon = 'special://home/addons/{0}/'.format(ADDON_ID)
+    if path.startswith(home_addon):
+        return os.path.join(ADDON_PATH, path[len(home_addon):])
+    for prefix, folder in [('special://home/userdata/addon_data/', 'addon_data'), ('special://temp/', 'temp')]:
+        if path.startswith(prefix):
+            return os.path.join(_State.data_root, folder, path[len(prefix):])
+    return path
+
+
+def _create_xbmc():
+    xbmc = types.ModuleType('xbmc')
+    xbmc.LOGDEBUG = 0
+    xbmc.LOGINFO = 1
+    xbmc.LOGERROR = 3
+    xbmc.ISO_639_1 = 0
+    xbmc.log = _log
+
+    def getLanguage(language_format=None, region=False):
+        _api_call('xbmc.getLanguage')
+        return 'en'
+
+    def getLocalizedString(string_id):
+        _api_call('xbmc.getLocalizedString')
+        return 'xbmc string {0}'.format(string_id)
+
+    xbmc.getLanguage = getLanguage
+    xbmc.getLocalizedString = getLocalizedString
+
+    class Monitor:
+        def abortRequested(self):
+            return True
+
+        def waitForAbort(self, timeout=0):
+            return True
+
+    xbmc.Monitor = Monitor
+    return xbmc
+
+
+def _create_xbmcaddon():
+    xbmcaddon = types.ModuleType('xbmcaddon')
+
+    class Addon:
+        def __init__(self, addon_id=None):
+            _api_call('xbmcaddon.Addon')
+
+        def getAddonInfo(self, key):
+            return {
+                'id': ADDON_ID,
+                'version': 'shim',
+                'icon': os.path.join(ADDON_PATH, 'icon.png'),
+                'path': ADDON_PATH
+            }.get(key, '')
+
+        def getSetting(self, key):
+            return _State.settings.get(key, '')
+
+        def setSetting(self, key, value):
+            _State.settings[key] = value
+
+        def getLocalizedString(self, string_id):
+            _api_call('Addon.getLocalizedString')
+            return _load_strings().get(string_id, '')
+
+    xbmcaddon.Addon = Addon
+    return xbmcaddon
+
+
+def _create_xbmcvfs():
+    xbmcvfs = types.ModuleType('xbmcvfs')
+    xbmcvfs.translatePath = _translate_path
+
+    def exists(path):
+        _api_call('xbmcvfs.exists')
+        return os.path.exists(path)
+
+    xbmcvfs.exists = exists
+
+    def mkdirs(path):
+        os.makedirs(path, exist_ok=True)
+        return True
+
+    def listdir(path):
+        entries = os.listdir(path)
+        return ([entry for entry in entries if os.path.isdir(os.path.join(path, entry))],
+                [entry for entry in entries if not os.path.isdir(os.path.join(path, entry))])
+
+    def delete(path):
+        os.remove(path)
+        return True
+
+    xbmcvfs.mkdirs = mkdirs
+    xbmcvfs.listdir = listdir
+    xbmcvfs.delete = delete
+    return xbmcvfs
+
+
+def _create_xbmcgui():
+    xbmcgui = types.ModuleType('xbmcgui')
+    xbmcgui.NOTIFICATION_INFO = 'info'
+    xbmcgui.NOTIFICATION_WARNING = 'warning'
+    xbmcgui.NOTIFICATION_ERROR = 'error'
+
+    class Window:
+        def __init__(self, window_id=10000):
+            pass
+
+        def getProperty(self, key):
+            return _State.properties.get(key.lower(), '')
+
+        def setProperty(self, key, value):
+            _State.properties[key.lower()] = value
+
+        def clearProperty(self, key):
+            _State.properties.pop(key.lower(), None)
+
+    class ListItem:
+        def __init__(self, label='', label2='', path=''):
+            self.label = label
+            self.path = path
+            self.art = {}
+            self.info = {}
+            self.properties = {}
+
+        def setArt(self, art):
+            self.art.update(art)
+
+        def setInfo(self, type, infoLabels):
+            self.info.update(infoLabels)
+
+        def setProperty(self, key, value):
+            self.properties[key] = value
+
+        def getLabel(self):
+            return self.label
+
+    class Dialog:
+        def notification(self, heading, message, icon=None, time=5000, sound=True):
+            _State.record.dialogs.append(('notification', heading, message))
+
+        def ok(self, heading, message):
+            _State.record.dialogs.append(('ok', heading, message))
+            return True
+
+        def textviewer(self, heading, text):
+            _State.record.dialogs.append(('textviewer', heading, text))
+
+    xbmcgui.Window = Window
+    xbmcgui.ListItem = ListItem
+    xbmcgui.Dialog = Dialog
+    return xbmcgui
+
+
+def _create_xbmcplugin():
+    xbmcplugin = types.ModuleType('xbmcplugin')
+
+    def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+        _api_call('xbmcplugin.addDirectoryItem')
+        _State.record.items.append((url, listitem, isFolder))
+        return True
+
+    def addDirectoryItems(handle, items, totalItems=0):
+        _api_call('xbmcplugin.addDirectoryItems')
+        for item in items:
+            url, listitem = item[0], item[1]
+            _State.record.items.append((url, listitem, item[2] if len(item) > 2 else False))
+        return True
+
+    def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+        _State.record.end_of_directory = True
+
+    def setContent(handle, content):
+        _State.record.content = content
+
+    def setResolvedUrl(handle, succeeded, listitem):
+        _State.record.resolved.append((succeeded, listitem))
+
+    xbmcplugin.addDirectoryItem = addDirectoryItem
+    xbmcplugin.addDirectoryItems = addDirectoryItems
+    xbmcplugin.endOfDirectory = endOfDirectory
+    xbmcplugin.setContent = setContent
+    xbmcplugin.setResolvedUrl = setResolvedUrl
+    return xbmcplugin
+
+
+def install(verbose=False, data_root=None):
+    """Register stand-in Kodi modules (only those which are not importable already)"""
+    _State.verbose = verbose
+    if _State.data_root is None:
+        _State.data_root = data_root or tempfile.mkdtemp(prefix='kodi_shim_')
+    for name, create in [('xbmc', _create_xbmc), ('xbmcaddon', _create_xbmcaddon), ('xbmcvfs', _create_xbmcvfs),
+                         ('xbmcgui', _create_xbmcgui), ('xbmcplugin', _create_xbmcplugin)]:
+        if name not in sys.modules:
+            sys.modules[name] = create()
+
+
+class KodiRuntime:
+    """
+    Headless Kodi in which default.main() can be invoked like from Kodi
+
+    Example:
+        runtime = KodiRuntime(settings={'username': 'me'})
+        record = runtime.invoke({'mode': 'folder'}, folder='CZ_TIPSPORT')
+    """
+    def __init__(self, settings=None, verbose=False, data_root=None):
+        """
+        :param data_root: directory of Kodi special:// paths (new temporary one by default), processes
+            sharing it share addon data like Kodi processes of one installation
+        """
+        self.data_root = data_root or tempfile.mkdtemp(prefix='kodi_shim_')
+        _State.data_root = self.data_root
+        install(verbose=verbose, data_root=self.data_root)
+        _State.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        _State.properties.clear()
+        self._default = None
+        os.makedirs(self.addon_data_path, exist_ok=True)  # Kodi creates it when addon settings are saved
+
+    @property
+    def addon_data_path(self):
+        return _translate_path('special://home/userdata/addon_data/{0}/'.format(ADDON_ID))
+
+    @property
+    def properties(self):
+        """Window properties (MemStorage content) shared by all invocations"""
+        return _State.properties
+
+    def import_default(self):
+        if self._default is None:
+            if ADDON_PATH not in sys.path:
+                sys.path.insert(0, ADDON_PATH)
+            import default
+            self._default = default
+        return self._default
+
+    def invoke(self, query=None, folder=None, handle=1):
+        """Run default.main() with given plugin query (dict) and return Record of this invocation"""
+        from urllib.parse import urlencode
+        base_url = 'plugin://{0}/'.format(ADDON_ID)
+        if folder:
+            base_url += folder + '/'
+        sys.argv = [base_url, str(handle), '?' + urlencode(query or {})]
+        _State.record = Record()
+        self.import_default().main()
+        return _State.record
+
+    def cleanup(self):
+        shutil.rmtree(self.data_root, ignore_errors=True)
+
+
+class BenchKodiHelper:
+    """Just the KodiHelper attributes used by Tipsport"""
+    def __init__(self, user_data, addon_data_path, program_cache_ttl=0, program_days=1):
+        self.user_data = user_data
+        self.addon_data_path = addon_data_path
+        self.tmp_path = addon_data_path
+        self.lib_path = addon_data_path
+        self.program_cache_ttl = program_cache_ttl
+        self.program_days = program_days
+        self.plugin_name = ADDON_ID
+        self.version = 'bench'
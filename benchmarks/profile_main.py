@@ -0,0 +1,156 @@
+"""
+Run and profile the real plugin entry point (default.main) per mode outside Kodi
+
+Every mode is invoked like Kodi would do it (sys.argv, Window properties shared between
+invocations) against the local stand-in server. Reports wall-clock time split into
+MemStorage, HTTP and the rest (HTTP from worker threads is reported separately, it overlaps
+with the main thread), and optionally cProfile statistics.
+
+Usage (from repository root):
+    python -m benchmarks.profile_main --latency 30 --repeat 5 --profile
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks import kodi_shim  # noqa: E402
+
+RUNTIME = kodi_shim.KodiRuntime()
+import requests  # noqa: E402
+from benchmarks.standin_server import StandInServer, redirect_addon  # noqa: E402
+from resources.lib.mem_storage import MemStorage  # noqa: E402
+
+INVOCATIONS = {
+    'root': ({}, None),
+    'folder': ({'mode': 'folder'}, 'CZ_TIPSPORT'),
+    'folder_all': ({'mode': 'folder'}, '_ALL'),
+    'play': ({'mode': 'play', 'name': 'Kladno - Sparta Praha', 'start_time': '00:00'}, None),
+    'check_login': ({'mode': 'check_login'}, None),
+    'notification': ({'mode': 'notification', 'title': 'title', 'message': 'message'}, None)
+}
+
+
+class Stopwatch:
+    """
+    Accumulate time spent in wrapped functions (nested calls of the same group are counted once)
+    Calls from worker threads are summed into separate '<group> (threads)' total
+    """
+    def __init__(self):
+        self.totals = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def wrap(self, group, owner, name):
+        original = getattr(owner, name)
+        stopwatch = self
+
+        def wrapper(*args, **kwargs):
+            depths = stopwatch._local.__dict__.setdefault('depths', {})
+            depth = depths.get(group, 0)
+            depths[group] = depth + 1
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                depths[group] = depth
+                if depth == 0:
+                    if threading.current_thread() is not threading.main_thread():
+                        group_name = group + ' (threads)'
+                    else:
+                        group_name = group
+                    with stopwatch._lock:
+                        stopwatch.totals[group_name] = stopwatch.totals.get(group_name, 0) + time.perf_counter() - start
+
+        setattr(owner, name, wrapper)
+
+    def reset(self):
+        self.totals = {}
+
+
+def create_stopwatch():
+    stopwatch = Stopwatch()
+    for name in ['__getitem__', '__setitem__', '__contains__', 'get_many', 'set_many']:
+        stopwatch.wrap('storage', MemStorage, name)
+    stopwatch.wrap('http', requests.Session, 'send')
+    return stopwatch
+
+
+def invoke(server, stopwatch, mode, match_url):
+    query, folder = INVOCATIONS[mode]
+    if mode == 'play':
+        query = dict(query, url=match_url)
+    server.reset_counts()
+    stopwatch.reset()
+    start = time.perf_counter()
+    record = RUNTIME.invoke(query, folder)
+    total = time.perf_counter() - start
+    storage = stopwatch.totals.get('storage', 0)
+    http = stopwatch.totals.get('http', 0)
+    http_threads = stopwatch.totals.get('http (threads)', 0)
+    return {
+        'mode': mode,
+        'total_ms': round(total * 1000, 2),
+        'storage_ms': round(storage * 1000, 2),
+        'http_ms': round(http * 1000, 2),
+        'http_threads_ms': round(http_threads * 1000, 2),
+        'other_ms': round((total - storage - http) * 1000, 2),
+        'requests': server.get_request_count(),
+        'items': len(record.items),
+        'dialogs': len(record.dialogs)
+    }
+
+
+def format_report(results):
+    columns = ['mode', 'total_ms', 'storage_ms', 'http_ms', 'http_threads_ms', 'other_ms', 'requests', 'items', 'dialogs']
+    lines = [''.join('{0:>17}'.format(column) for column in columns)]
+    for result in results:
+        lines.append(''.join('{0:>17}'.format(result[column]) for column in columns))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=list(INVOCATIONS), default=list(INVOCATIONS))
+    parser.add_argument('--latency', type=float, default=20, help='injected latency of every response in ms')
+    parser.add_argument('--repeat', type=int, default=3, help='invocations of every mode')
+    parser.add_argument('--profile', action='store_true', help='print cProfile statistics of every mode')
+    parser.add_argument('--profile-out', help='directory for pstats files (one per mode)')
+    parser.add_argument('--top', type=int, default=15, help='number of functions in cProfile statistics')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    stopwatch = create_stopwatch()
+    results = []
+    with StandInServer(latency=args.latency / 1000.0) as server:
+        redirect_addon(server)
+        match_url = server.program['program'][0]['matchesByTimespans'][0][0]['url']
+        for mode in args.modes:
+            profiler = cProfile.Profile() if args.profile or args.profile_out else None
+            for _ in range(args.repeat):
+                if profiler:
+                    profiler.enable()
+                results.append(invoke(server, stopwatch, mode, match_url))
+                if profiler:
+                    profiler.disable()
+            if profiler and args.profile_out:
+                os.makedirs(args.profile_out, exist_ok=True)
+                profiler.dump_stats(os.path.join(args.profile_out, mode + '.pstats'))
+            if profiler and args.profile:
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(args.top)
+                print('=== {0} ==='.format(mode), file=sys.stderr)
+                print(output.getvalue(), file=sys.stderr)
+    RUNTIME.cleanup()
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Generator of synthetic tv/program responses of arbitrary size
+
+Output has the shape consumed by Tipsport.get_list_matches:
+    {'program': [{'id': .., 'name': .., 'matchesByTimespans': [[match, ...], ...]}, ...]}
+"""
+import json
+import random
+
+SPORTS = [(23, 'Hokej'), (16, 'Fotbal'), (43, 'Tenis'), (7, 'Basketbal'), (84, 'Volejbal'), (20, 'Házená'),
+          (190, 'Florbal'), (70, 'Esport'), (28, 'Baseball'), (55, 'Šipky')]
+HOCKEY_COMPETITIONS = [u'Tipsport extraliga', u'Česká Chance liga', u'Tipsport Liga', u'KHL', u'NHL', u'SHL']
+TEAMS = [u'Kladno', u'Sparta Praha', u'Třinec', u'Pardubice', u'Plzeň', u'Zlín', u'Olomouc', u'Litvínov',
+         u'K.Vary', u'H.Králové', u'M.Boleslav', u'Vítkovice', u'Liberec', u'Kometa Brno', u'Košice', u'Nitra',
+         u'Zvolen', u'Poprad', u'Slovan', u'Michalovce', u'Jihlava', u'Přerov', u'Kadaň', u'Vsetín']
+TIMESPANS = 4
+
+
+def generate_program(match_count, sport_count=len(SPORTS), competitions_per_sport=8, seed=0, first_id=1000000):
+    """Generate tv/program dict with match_count matches spread over sports and competitions"""
+    rng = random.Random(seed)
+    sports = SPORTS[:sport_count]
+    program = [{
+        'id': sport_id,
+        'name': sport_name,
+        'matchesByTimespans': [[] for _ in range(TIMESPANS)]
+    } for sport_id, sport_name in sports]
+    for number in range(match_count):
+        sport_index = rng.randrange(len(sports))
+        sport_id, sport_name = sports[sport_index]
+        if sport_id == 23:
+            competition = rng.choice(HOCKEY_COMPETITIONS)
+        else:
+            competition = u'{0} liga {1}'.format(sport_name, rng.randrange(competitions_per_sport))
+        first_team, second_team = rng.sample(TEAMS, 2)
+        minutes = rng.randrange(24 * 60)
+        live = rng.random() < 0.3
+        match = {
+            'id': first_id + number,
+            'name': u'{0}-{1}'.format(first_team, second_team),
+            'competition': competition,
+            'sport': sport_name,
+            'url': u'/{0}-{1}/{2}'.format(first_team.lower(), second_team.lower(), first_id + number),
+            'matchStartTime': '{0:02d}:{1:02d}'.format(minutes // 60, minutes % 60),
+            'live': live,
+            'score': {
+                'statusOffer': u'1. třetina' if live else u'',
+                'scoreOffer': u'{0}:{1}'.format(rng.randrange(6), rng.randrange(6)) if live else None
+            },
+            'streamSource': rng.choice(['LIVEBOX_ELH', 'LIVEBOX_SK', 'HUSTE', 'MANUAL']),
+            'hasStream': True,
+            'eventTableUrl': None
+        }
+        program[sport_index]['matchesByTimespans'][minutes * TIMESPANS // (24 * 60)].append(match)
+    return {'program': program}
+
+
+def generate_program_body(match_count, **kwargs):
+    """Generate tv/program response body (bytes)"""
+    return json.dumps(generate_program(match_count, **kwargs)).encode('utf-8')
@@ -0,0 +1,228 @@
+"""
+Local HTTP stand-in for Tipsport and the login provider
+
+Serves synthetic responses for every endpoint used by Tipsport class, counts requests
+and can delay every response to simulate network latency.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+SESSION_COOKIE = 'JSESSIONID=standin'
+LOGIN_PATH = '/rest/client/v1/session'
+LOGIN_PROVIDER_PATH = '/api/get_login_request'
+STREAM_PATH_PREFIX = '/rest/offer/v2/live/matches/'
+HLS_URL = 'https://stream.invalid/live/index.m3u8?hdnts=exp={expires}~acl=/*~hmac=00'
+
+
+def create_program(matches=4):
+    """Small ice hockey program in shape of tv/program response"""
+    return {
+        'program': [{
+            'id': 23,
+            'matchesByTimespans': [[{
+                'name': 'Kladno-Sparta Praha',
+                'competition': u'Tipsport extraliga',
+                'sport': 'Hokej',
+                'url': '/kladno-sparta-praha/{0}'.format(1000 + number),
+                'matchStartTime': '00:00',
+                'score': {
+                    'statusOffer': '1. třetina',
+                    'scoreOffer': '0:0'
+                },
+                'live': True
+            } for number in range(matches)]]
+        }]
+    }
+
+
+def default_stream_formats():
+    """
+    Response type for every format query parameter of stream endpoint
+    None is the started check (request without format)
+    """
+    return {None: 'RTMP', 'HLS': 'HLS', 'RTMP': 'RTMP', 'RTMP_WITH_HLS': 'RTMP_WITH_HLS', 'OTHER': 'URL_TVCOM'}
+
+
+class StandInServer:
+    """
+    Usage:
+        with StandInServer(latency=0.05) as server:
+            redirect_addon(server)
+    """
+    def __init__(self, latency=0.0, program=None, stream_formats=None, host='127.0.0.1', port=0, programs_by_day=None):
+        """
+        :param programs_by_day: dict day -> program served for that day (program is served for other days)
+        """
+        self.latency = latency
+        self.program = program if program is not None else create_program()
+        self.programs_by_day = programs_by_day or {}
+        self.stream_formats = stream_formats or default_stream_formats()
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    @property
+    def login_provider_url(self):
+        return self.url + LOGIN_PROVIDER_PATH
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests.clear()
+
+    def get_request_count(self):
+        with self._lock:
+            return sum(self.requests.values())
+
+    def _count(self, method, path):
+        with self._lock:
+            self.requests[method + ' ' + path] += 1
+
+    def _program_body(self, day):
+        return json.dumps(self.programs_by_day.get(day, self.program)).encode('utf-8')
+
+    def _create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _reply_json(self, data, status=200, headers=None):
+                self._reply(status, json.dumps(data).encode('utf-8'), dict(headers or {}, **{'Content-Type': 'application/json'}))
+
+            def _is_logged_in(self):
+                return SESSION_COOKIE in (self.headers.get('Cookie') or '')
+
+            def _read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+
+            def _handle(self, method):
+                url = urlsplit(self.path)
+                server._count(method, url.path)
+                self._read_body()
+                if server.latency:
+                    time.sleep(server.latency)
+                route = (method, url.path)
+                if route == ('POST', LOGIN_PROVIDER_PATH):
+                    return self._login_request()
+                if route == ('POST', LOGIN_PATH):
+                    return self._reply(200, b'{}', {'Set-Cookie': SESSION_COOKIE + '; Path=/'})
+                if route == ('PUT', '/rest/ver1/client/restrictions/login/duration'):
+                    return self._reply_json({'duration': 600}) if self._is_logged_in() else self._reply(401)
+                if route == ('GET', '/rest/articles/v1/tv/program'):
+                    return self._program(int(parse_qs(url.query).get('day', ['0'])[0]))
+                if route == ('GET', '/rest/articles/v1/tv/info'):
+                    return self._reply_json({'buttonDescription': None})
+                if method == 'GET' and url.path.startswith(STREAM_PATH_PREFIX) and url.path.endswith('/stream'):
+                    return self._stream(parse_qs(url.query))
+                if route == ('GET', '/'):
+                    return self._reply(200, b'<html></html>', {'Content-Type': 'text/html'})
+                return self._reply(404)
+
+            def _login_request(self):
+                self._reply_json({
+                    'version': 1,
+                    'url': server.url + LOGIN_PATH,
+                    'post_data': '{"username": "#USERNAME#", "password": "#PASSWORD#"}',
+                    'username_keyword': '#USERNAME#',
+                    'password_keyword': '#PASSWORD#',
+                    'headers': {
+                        'Content-Type': 'application/json'
+                    }
+                })
+
+            def _program(self, day):
+                if not self._is_logged_in():
+                    return self._reply(401)
+                body = server._program_body(day)
+                etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+                if self.headers.get('If-None-Match') == etag:
+                    return self._reply(304, headers={'ETag': etag})
+                self._reply(200, body, {'Content-Type': 'application/json', 'ETag': etag})
+
+            def _stream(self, query):
+                if not self._is_logged_in():
+                    return self._reply(401)
+                stream_format = query.get('format', [None])[0]
+                stream_type = server.stream_formats.get(stream_format)
+                hls_url = HLS_URL.format(expires=int(time.time()) + 3600)
+                data = {
+                    'HLS': hls_url,
+                    'RTMP': 'rtmp://stream.invalid/live/app/stream',
+                    'RTMP_WITH_HLS': 'rtmp://stream.invalid/live/app/stream###' + hls_url,
+                    'INF': 'Stream has not started',
+                    'URL_TVCOM': 'https://stream.invalid/tvcom'
+                }.get(stream_type)
+                self._reply_json({'displayRules': {}, 'source': 'STANDIN', 'type': stream_type or 'UNKNOWN', 'data': data})
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def do_PUT(self):
+                self._handle('PUT')
+
+        return Handler
+
+
+def redirect_addon(server):
+    """Point every UserData and the login provider of the addon to the stand-in server"""
+    from resources.lib import tipsport_stream_generator
+    redirect_user_data(server.url)
+    tipsport_stream_generator.LOGIN_PROVIDER_URL = server.login_provider_url
+
+
+def redirect_user_data(url):
+    """Point every UserData to url (imports only the small user_data module)"""
+    from resources.lib import user_data
+    original_init = user_data.UserData.__init__
+    if getattr(original_init, 'redirected', False):
+        original_init = original_init.original
+
+    def init(self, username, password, site):
+        original_init(self, username, password, site)
+        self.site = self.site_mobile = url
+
+    init.redirected = True
+    init.original = original_init
+    user_data.UserData.__init__ = init
@@ -1,22 +1,26 @@
 import sys
-import xbmc
 import xbmcgui
 import xbmcplugin
-import traceback
-import requests
-from resources.lib.tipsport_stream_generator import Tipsport
 import resources.lib.tipsport_exceptions as Exceptions
-from resources.lib.kodi_helper import KodiHelper
-from resources.lib.mem_storage import MemStorage
-from resources.lib.utils import log, get_host_info, update_code_from_git
+from resources.lib.kodi_helper import KodiHelper, TIPSPORT_STORAGE_KEY
+from resources.lib.stream_cache import StreamCache
+from resources.lib.mem_storage import MemStorage, JsonCodec
+from resources.lib.utils import log, log_exception, get_host_info, get_stream_number, update_code_from_git
+from resources.lib.utils import get_connection_exceptions
+from resources.lib.tracing import span, start_trace, finish_trace
+
+# Every click runs this script in a new interpreter. Tipsport (with requests) and PIL are imported
+# only in modes which really need them, see benchmarks/bench_import.py
 
 
 def send_crash_report(kodi_helper, exception):
     """Send crash log to google script to process it"""
     if not kodi_helper.send_crash_reports:
         return False
+    import traceback
+    from resources.lib.http_client import create_session
     try:
-        session = requests.session()
+        session = create_session(retries=0)
         addon = kodi_helper.plugin_name
         version = kodi_helper.version
         data = traceback.format_exc()
@@ -33,7 +37,7 @@ def send_crash_report(kodi_helper, exception):
             return True
         else:
             return False
-    except (requests.ConnectionError, requests.ConnectTimeout):
+    except get_connection_exceptions():
         return False
 
 
@@ -65,49 +69,56 @@ def show_all_matches(kodi_helper, tipsport, folder_url):
     """Generate list of all matches in folders (sport -> competition -> match)"""
     url_tokens = folder_url.split('/')
     url_mode = len(url_tokens)
+    catalog = tipsport.get_match_catalog()
     if url_mode == 1:  # need to show sport folders
         xbmcplugin.setContent(kodi_helper.plugin_handle, 'movies')
-        matches = tipsport.get_list_matches(url_tokens[0])
-        if len(matches) == 0:
+        sports = catalog.get_sports()
+        if len(sports) == 0:
             show_localized_notification(kodi_helper, 30004, 30005, xbmcgui.NOTIFICATION_INFO)
-        sports = list(set([m.sport for m in matches]))
-        for sport in sports:
-            url = kodi_helper.build_folder_url(sport, {'mode': 'folder'})
-            list_item = xbmcgui.ListItem(sport)
-            list_item.setInfo(type='Video', infoLabels={'Plot': sport})
-            xbmcplugin.addDirectoryItem(handle=kodi_helper.plugin_handle, url=url, listitem=list_item, isFolder=True)
+        add_folder_items(kodi_helper, sports)
         xbmcplugin.endOfDirectory(kodi_helper.plugin_handle, cacheToDisc=False)
     elif url_mode == 2:  # competition folders
         xbmcplugin.setContent(kodi_helper.plugin_handle, 'movies')
-        matches = tipsport.get_list_matches(url_tokens[0])
-        matches = [m for m in matches if m.sport == url_tokens[1]]
-        if len(matches) == 0:
+        competitions = catalog.get_competitions(url_tokens[1])
+        if len(competitions) == 0:
             show_localized_notification(kodi_helper, 30004, 30005, xbmcgui.NOTIFICATION_INFO)
-        competitions = list(set([m.competition for m in matches]))
-        for competition in competitions:
-            url = kodi_helper.build_folder_url(competition, {'mode': 'folder'})
-            list_item = xbmcgui.ListItem(competition)
-            list_item.setInfo(type='Video', infoLabels={'Plot': competition})
-            xbmcplugin.addDirectoryItem(handle=kodi_helper.plugin_handle, url=url, listitem=list_item, isFolder=True)
+        add_folder_items(kodi_helper, competitions)
         xbmcplugin.endOfDirectory(kodi_helper.plugin_handle, cacheToDisc=False)
     else:  # match folders
         xbmcplugin.setContent(kodi_helper.plugin_handle, 'movies')
-        matches = tipsport.get_list_matches(url_tokens[0])
-        matches = [m for m in matches if m.sport == url_tokens[1] and m.competition == url_tokens[2]]
+        matches = catalog.get_matches(url_tokens[1], url_tokens[2])
         if len(matches) == 0:
             show_localized_notification(kodi_helper, 30004, 30005, xbmcgui.NOTIFICATION_INFO)
-        for match in matches:
-            add_match_item(match, kodi_helper)
+        add_match_items(kodi_helper, matches)
         xbmcplugin.endOfDirectory(kodi_helper.plugin_handle, cacheToDisc=False)
 
 
-def add_match_item(match, kodi_helper):
+def add_folder_items(kodi_helper, names):
+    """Add folders with given names to the listing at once"""
+    items = []
+    for name in names:
+        list_item = xbmcgui.ListItem(name)
+        list_item.setInfo(type='Video', infoLabels={'Plot': name})
+        items.append((kodi_helper.build_folder_url(name, {'mode': 'folder'}), list_item, True))
+    xbmcplugin.addDirectoryItems(kodi_helper.plugin_handle, items, len(items))
+
+
+def add_match_items(kodi_helper, matches):
+    """Build all match items first and add them to the listing with a single call into Kodi"""
+    items = [create_match_item(match, kodi_helper) for match in matches]
+    xbmcplugin.addDirectoryItems(kodi_helper.plugin_handle, items, len(items))
+
+
+def create_match_item(match, kodi_helper):
+    """Return (url, list item, is folder) of match"""
+    start_time_label = match.get_start_time_label()
     if match.is_stream_enabled():
         url = kodi_helper.build_url({
             'mode': 'play',
             'url': match.url,
             'name': match.name,
-            'start_time': match.start_time
+            'competition': match.competition,
+            'start_time': start_time_label
         })
     else:
         url = kodi_helper.build_url({
@@ -119,9 +130,9 @@ def add_match_item(match, kodi_helper):
         plot = '\n{text}: {score:<20}{status}'.format(
             text=kodi_helper.get_local_string(30003),
             score=match.score or '',  # If score is None TypeError is thrown
-            status=match.status if xbmc.getLanguage(xbmc.ISO_639_1) == 'cs' else '')
+            status=match.status if kodi_helper.language == 'cs' else '')
     else:
-        plot = '{text} {time}'.format(text=kodi_helper.get_local_string(30002), time=match.start_time)
+        plot = '{text} {time}'.format(text=kodi_helper.get_local_string(30002), time=start_time_label)
     possible_match_icon = kodi_helper.get_match_icon(match.first_team, match.second_team,
                                                      match.is_competition_with_logo)
     if possible_match_icon:
@@ -132,7 +143,7 @@ def add_match_item(match, kodi_helper):
     list_item.setArt({'icon': icon})
     list_item.setInfo(type='Video', infoLabels={'Plot': plot})
     list_item.setProperty('IsPlayable', 'true')
-    xbmcplugin.addDirectoryItem(handle=kodi_helper.plugin_handle, url=url, listitem=list_item)
+    return url, list_item, False
 
 
 def show_available_elh_matches(kodi_helper, tipsport, competitions):
@@ -141,8 +152,7 @@ def show_available_elh_matches(kodi_helper, tipsport, competitions):
     matches = tipsport.get_list_matches(competitions)
     if len(matches) == 0:
         show_localized_notification(kodi_helper, 30004, 30005, xbmcgui.NOTIFICATION_INFO)
-    for match in matches:
-        add_match_item(match, kodi_helper)
+    add_match_items(kodi_helper, matches)
     xbmcplugin.endOfDirectory(kodi_helper.plugin_handle, cacheToDisc=False)
 
 
@@ -181,10 +191,34 @@ def show_available_competitions(kodi_helper):
     xbmcplugin.endOfDirectory(kodi_helper.plugin_handle)
 
 
+def generate_missing_icons(kodi_helper, tipsport):
+    """
+    Generate icons of all matches in background, the listing is already shown with icons which were ready
+    Background service does it when it runs, so the plugin process ends right after the listing
+    """
+    if not kodi_helper.can_generate_logos or kodi_helper.background_service:
+        return
+    from resources.lib.icon_pipeline import IconPipeline
+    IconPipeline(kodi_helper).start(tipsport.get_match_catalog().get_matches())
+
+
+def refresh_login_descriptor(kodi_helper, tipsport):
+    """
+    Download login descriptor again if it is getting old, so login does not wait for the login provider
+    The listing is already shown, nobody waits for it here. Background service does it when it runs.
+    """
+    if kodi_helper.background_service:
+        return
+    try:
+        tipsport.refresh_login_descriptor()
+    except get_connection_exceptions() + (Exceptions.LoginFailedException, Exceptions.NeedPluginUpdateException):
+        log_exception()
+
+
 def get_new_tipsport(kodi_helper):
+    from resources.lib.tipsport_stream_generator import Tipsport
     tipsport = Tipsport(kodi_helper, None)
-    if not tipsport.is_logged_in():
-        tipsport.login()
+    tipsport.relogin_if_needed()
     return tipsport
 
 
@@ -192,28 +226,59 @@ def show_support_dialog(kodi_helper):
     xbmcgui.Dialog().textviewer(kodi_helper.get_local_string(32013), kodi_helper.get_local_string(32014))
 
 
-def get_tipsport_from_storage_add_save_it(storage, id, kodi_helper):
-    if id not in storage:
-        tipsport = get_new_tipsport(kodi_helper)
-        storage[id] = tipsport
-        return tipsport
-    try:
-        return storage[id]
-    except UnicodeEncodeError:
+def load_tipsport_state(storage, id):
+    with span('storage load'):
+        return storage.get(id)
+
+
+def get_tipsport_from_storage_add_save_it(storage, id, kodi_helper, state=None):
+    """:param state: snapshot already loaded from storage (see load_tipsport_state), loaded if None"""
+    from resources.lib.tipsport_stream_generator import Tipsport
+    if state is None:
+        state = load_tipsport_state(storage, id)
+    tipsport = Tipsport.from_state(kodi_helper, state)
+    if tipsport is None:
         tipsport = get_new_tipsport(kodi_helper)
-        storage[id] = tipsport
-        return tipsport
+        save_tipsport(storage, id, tipsport)
+    return tipsport
+
+
+def save_tipsport(storage, id, tipsport):
+    with span('storage save'):
+        storage[id] = tipsport.get_state()
+
+
+def get_cached_stream(storage, state, relative_url):
+    """
+    Get already resolved stream from Tipsport snapshot (see load_tipsport_state) without creating Tipsport
+    Return None if there is none or it was played just a while ago (the link is probably dead, see StreamCache)
+    Snapshot is stored back only if its streams have changed
+    """
+    if not isinstance(state, dict) or 'streams' not in state:
+        return None
+    stream_cache = StreamCache(state['streams'])
+    stream = stream_cache.get_for_playback(get_stream_number(relative_url))
+    streams = stream_cache.get_state()
+    if streams != state['streams']:
+        state['streams'] = streams
+        with span('storage save'):
+            storage[TIPSPORT_STORAGE_KEY] = state
+    return stream
 
 
 def main():
     kodi_helper = KodiHelper(plugin_handle=int(sys.argv[1]), args=sys.argv[2][1:], base_url=sys.argv[0])
-    storage = MemStorage('plugin.video.tipsport.elh_' + kodi_helper.version)
-    tipsport_storage_id = 'tsg'
+    storage = MemStorage(kodi_helper.storage_id, codec=JsonCodec)
+    tipsport_storage_id = TIPSPORT_STORAGE_KEY
     mode = kodi_helper.get_arg('mode')
+    if kodi_helper.trace:
+        start_trace(mode or 'root')
     try:
         if mode is None:
-            if tipsport_storage_id not in storage:
-                storage[tipsport_storage_id] = get_new_tipsport(kodi_helper)
+            with span('storage load'):
+                is_stored = tipsport_storage_id in storage
+            if not is_stored:
+                save_tipsport(storage, tipsport_storage_id, get_new_tipsport(kodi_helper))
             show_available_competitions(kodi_helper)
             if kodi_helper.is_time_to_show_support_dialog():
                 show_support_dialog(kodi_helper)
@@ -225,14 +290,19 @@ def main():
                 show_all_matches(kodi_helper, tipsport, folder_url)
             else:
                 show_available_elh_matches(kodi_helper, tipsport, folder_url)
-            storage[tipsport_storage_id] = tipsport
+            save_tipsport(storage, tipsport_storage_id, tipsport)
+            generate_missing_icons(kodi_helper, tipsport)
+            refresh_login_descriptor(kodi_helper, tipsport)
 
         elif mode == 'play':
-            tipsport = get_tipsport_from_storage_add_save_it(storage, tipsport_storage_id, kodi_helper)
-            stream = tipsport.get_stream(kodi_helper.get_arg('url'))
+            state = load_tipsport_state(storage, tipsport_storage_id)
+            stream = get_cached_stream(storage, state, kodi_helper.get_arg('url'))
+            if stream is None:
+                tipsport = get_tipsport_from_storage_add_save_it(storage, tipsport_storage_id, kodi_helper, state)
+                stream = tipsport.get_stream(kodi_helper.get_arg('url'), kodi_helper.get_arg('competition'))
+                save_tipsport(storage, tipsport_storage_id, tipsport)
             title = '{name} ({time})'.format(name=kodi_helper.get_arg('name'), time=kodi_helper.get_arg('start_time'))
             play_video(kodi_helper.plugin_handle, title, kodi_helper.icon, stream)
-            storage[tipsport_storage_id] = tipsport
 
         elif mode == 'notification':
             show_notification(kodi_helper.get_arg('title'), kodi_helper.get_arg('message'), xbmcgui.NOTIFICATION_INFO)
@@ -241,17 +311,16 @@ def main():
             tipsport = get_new_tipsport(kodi_helper)
             if not tipsport.is_logged_in():
                 raise Exceptions.LoginFailedException()
-            storage[tipsport_storage_id] = tipsport
+            save_tipsport(storage, tipsport_storage_id, tipsport)
             show_localized_notification(kodi_helper, 30000, 30001, xbmcgui.NOTIFICATION_INFO)
         elif mode == 'update_git_latest':
             update_code_from_git(kodi_helper)
             show_localized_notification(kodi_helper, 30004, 32016, xbmcgui.NOTIFICATION_INFO)
 
-    except (Exceptions.NoInternetConnectionsException, requests.ConnectionError, requests.ConnectTimeout,
-            requests.exceptions.ChunkedEncodingError):
-        log(traceback.format_exc())
+    except get_connection_exceptions():
+        log_exception()
         show_localized_notification(kodi_helper, 32000, 32001)
-    except Exceptions.LoginFailedException:
+    except (Exceptions.LoginFailedException, Exceptions.SessionExpiredException):
         show_localized_notification(kodi_helper, 32000, 32002)
     except Exceptions.UnableGetStreamMetadataException:
         show_localized_notification(kodi_helper, 32000, 32003)
@@ -279,8 +348,21 @@ def main():
         if send_crash_report(kodi_helper, e):
             show_localized_notification(kodi_helper, 32000, 32009)
         else:
-            log(traceback.format_exc())
+            log_exception()
             show_localized_notification(kodi_helper, 32000, 32008)
+    finally:
+        save_trace(kodi_helper)
+
+
+def save_trace(kodi_helper):
+    """Append timing trace of this invocation to the trace file (if tracing is enabled)"""
+    try:
+        trace = finish_trace(kodi_helper.addon_data_path)
+    except OSError as e:
+        log('Unable to save trace: {0}'.format(e))
+        return
+    if trace is not None:
+        log('Trace {0}: {1} ms'.format(trace['name'], trace['ms']))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+# coding=utf-8
+import random
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .tracing import record_response
+
+CONNECT_TIMEOUT = 5  # seconds
+READ_TIMEOUT = 20  # seconds
+POOL_CONNECTIONS = 4  # number of hosts with pooled connections
+POOL_MAXSIZE = 8  # connections per host, enough for concurrent stream probes
+RETRIES = 2
+READ_RETRIES = 0  # a hung server is not asked again, the user would wait READ_TIMEOUT for every attempt
+BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = [502, 503, 504]
+
+
+class JitteredRetry(Retry):
+    """Retry of requests which failed to connect or of idempotent ones with bad status, with randomized backoff"""
+    def get_backoff_time(self):
+        backoff = super(JitteredRetry, self).get_backoff_time()
+        return backoff * random.uniform(0.5, 1.5)
+
+
+class HttpSession(requests.Session):
+    """Session which uses default timeout for every request without explicit one"""
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        super(HttpSession, self).__init__()
+        self.timeout = timeout
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super(HttpSession, self).send(request, **kwargs)
+
+
+def create_retry(retries=RETRIES, read_retries=READ_RETRIES):
+    kwargs = {
+        'total': retries,
+        'connect': retries,
+        'read': min(retries, read_retries),
+        'status': retries,
+        'backoff_factor': BACKOFF_FACTOR,
+        'status_forcelist': RETRY_STATUSES,
+        'raise_on_status': False
+    }
+    try:
+        return JitteredRetry(allowed_methods=Retry.DEFAULT_ALLOWED_METHODS, **kwargs)
+    except (TypeError, AttributeError):  # urllib3 < 1.26
+        return JitteredRetry(method_whitelist=Retry.DEFAULT_METHOD_WHITELIST, **kwargs)
+
+
+def create_session(timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), pool_maxsize=POOL_MAXSIZE, retries=RETRIES):
+    """
+    Create session used for all HTTP traffic of the addon
+
+    Connections (and TLS handshakes) are reused from the pool, failed connections and idempotent
+    requests with bad status are retried with jittered backoff. Read timeouts are not retried,
+    so no request waits for a hung socket longer than the timeout.
+    Every response is recorded in the current tracing span.
+    """
+    session = HttpSession(timeout)
+    session.hooks['response'].append(record_response)
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=create_retry(retries))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
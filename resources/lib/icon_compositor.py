@@ -0,0 +1,131 @@
+# coding=utf-8
+import threading
+from collections import OrderedDict
+from importlib.util import find_spec
+
+LOGO_CACHE_SIZE = 32  # decoded logos kept in memory (about 1 MB each)
+PNG_COMPRESS_LEVEL = 1  # icons are temporary files, encoding with default level takes twice as long
+CAN_USE_NUMPY = None  # unknown until first needed
+_COMPOSITOR = None
+_COMPOSITOR_LOCK = threading.Lock()
+
+
+def get_compositor():
+    """Compositor shared by the whole process, so decoded logos are reused by every icon"""
+    global _COMPOSITOR
+    if _COMPOSITOR is None:
+        with _COMPOSITOR_LOCK:
+            if _COMPOSITOR is None:
+                _COMPOSITOR = IconCompositor()
+    return _COMPOSITOR
+
+
+def get_icon_filename(logo_1, logo_2):
+    """File name of icon of the match of teams with given logo names"""
+    return '_' + logo_1 + '_VS_' + logo_2 + '.png'
+
+
+def is_numpy_available():
+    """Check NumPy can be imported without importing it"""
+    global CAN_USE_NUMPY
+    if CAN_USE_NUMPY is None:
+        try:
+            CAN_USE_NUMPY = find_spec('numpy') is not None
+        except (ImportError, ValueError):
+            CAN_USE_NUMPY = False
+    return CAN_USE_NUMPY
+
+
+class IconCompositor:
+    """
+    Composes match icon: first team logo in the left half, second one in the right half and the vs overlay on top
+
+    Logos are decoded, resized to half of the overlay and kept in a bounded LRU cache. With NumPy the
+    overlay is blended in one vectorized operation over its visible pixels only, otherwise by PIL paste.
+    Both give the same pixels as pasting the logos with their own alpha as mask onto a transparent canvas.
+    """
+    def __init__(self, cache_size=LOGO_CACHE_SIZE, use_numpy=None):
+        self._cache_size = cache_size
+        self._use_numpy = is_numpy_available() if use_numpy is None else use_numpy
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compose(self, overlay_path, first_path, second_path):
+        """Return RGBA PIL image of match icon"""
+        if self._use_numpy:
+            return self._compose_numpy(overlay_path, first_path, second_path)
+        return self._compose_pil(overlay_path, first_path, second_path)
+
+    def save(self, overlay_path, first_path, second_path, path):
+        self.compose(overlay_path, first_path, second_path).save(path, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+
+    def _compose_pil(self, overlay_path, first_path, second_path):
+        from PIL import Image
+        overlay = self._get(('pil', overlay_path), lambda: self._open(overlay_path))
+        width, height = overlay.size
+        first = self._get(('pil', first_path, width // 2, height),
+                          lambda: self._open(first_path, (width // 2, height)))
+        second = self._get(('pil', second_path, width - width // 2, height),
+                           lambda: self._open(second_path, (width - width // 2, height)))
+        icon = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        icon.paste(first, (0, 0), first)
+        icon.paste(second, (width // 2, 0), second)
+        icon.paste(overlay, (0, 0), overlay)
+        return icon
+
+    def _compose_numpy(self, overlay_path, first_path, second_path):
+        import numpy
+        from PIL import Image
+        (width, height), visible, overlay, keep = self._get(('numpy', overlay_path),
+                                                            lambda: self._load_overlay(overlay_path))
+        icon = numpy.concatenate([
+            self._get(('numpy', first_path, width // 2, height),
+                      lambda: self._load_team(first_path, (width // 2, height))),
+            self._get(('numpy', second_path, width - width // 2, height),
+                      lambda: self._load_team(second_path, (width - width // 2, height)))
+        ], axis=1)
+        pixels = icon.reshape(-1, 4)
+        blended = pixels[visible] * keep + overlay  # uint16, never exceeds 255 * 255 + 128
+        pixels[visible] = (blended + (blended >> 8)) >> 8
+        return Image.fromarray(icon, 'RGBA')
+
+    def _load_overlay(self, overlay_path):
+        """
+        Terms of PIL paste blend out = (overlay * alpha + icon * (255 - alpha) + 128) / 255 for pixels where
+        the overlay is visible (elsewhere the icon stays as it is)
+        Return (size, indexes of visible pixels, overlay * alpha + 128, 255 - alpha)
+        """
+        import numpy
+        image = self._open(overlay_path)
+        pixels = numpy.asarray(image, dtype=numpy.uint16).reshape(-1, 4)
+        visible = numpy.flatnonzero(pixels[:, 3])
+        alpha = pixels[visible, 3:]
+        return image.size, visible, pixels[visible] * alpha + 128, 255 - alpha
+
+    def _load_team(self, logo_path, size):
+        """Logo pasted onto the transparent canvas (every band multiplied by alpha, like PIL paste does)"""
+        import numpy
+        pixels = numpy.asarray(self._open(logo_path, size), dtype=numpy.uint16)
+        blended = pixels * pixels[:, :, 3:] + 128
+        return ((blended + (blended >> 8)) >> 8).astype(numpy.uint8)
+
+    @staticmethod
+    def _open(image_path, size=None):
+        from PIL import Image
+        image = Image.open(image_path).convert('RGBA')
+        if size is not None and image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+        return image
+
+    def _get(self, key, load):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+                return value
+        value = load()
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return value
@@ -0,0 +1,83 @@
+# coding=utf-8
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+from .icon_compositor import get_icon_filename
+from .process_lock import FileLock
+from .utils import log
+
+ICON_WORKERS = 2  # PIL and NumPy release GIL while blending and encoding, more threads would only compete with Kodi
+ICON_TIME_LIMIT = 20  # seconds, icons left are generated next time
+ICONS_LOCK_FILENAME = 'icons.lock'
+
+
+class IconPipeline:
+    """
+    Generates missing icons of all matches of the program in background
+
+    Listings never wait for an icon: they show icons which are ready and the competition logo
+    for the rest (see KodiHelper.get_match_icon). Icons are written under a temporary name and renamed,
+    so another invocation of the addon (or the service) never sees a half written icon.
+    Only one process generates icons at a time, others leave the work to it. Generation stops after
+    ICON_TIME_LIMIT, so a plugin process does not linger long after its listing is shown.
+    Kodi can not start processes from an embedded interpreter, so icons are generated by a pool of threads.
+    """
+    def __init__(self, kodi_helper, workers=ICON_WORKERS, time_limit=ICON_TIME_LIMIT):
+        self._kodi_helper = kodi_helper
+        self._workers = workers
+        self._time_limit = time_limit
+        self._thread = None
+        self._generated = 0
+
+    def get_missing(self, matches):
+        """Return {file name: (logo name of first team, logo name of second team)} of icons which are not generated"""
+        ready = self._kodi_helper.get_ready_icons()
+        missing = {}
+        for match in matches:
+            logos = self._kodi_helper.get_match_logos(match.first_team, match.second_team,
+                                                      match.is_competition_with_logo)
+            if logos is not None and get_icon_filename(*logos) not in ready:
+                missing[get_icon_filename(*logos)] = logos
+        return missing
+
+    def start(self, matches):
+        """
+        Start generation of missing icons of matches in background (does not wait)
+        Return number of icons to generate, 0 if other process is generating icons already
+        """
+        missing = self.get_missing(matches)
+        if len(missing) == 0:
+            return 0
+        lock = FileLock(path.join(self._kodi_helper.addon_data_path, ICONS_LOCK_FILENAME), timeout=0)
+        if not lock.acquire():
+            return 0
+        log('Generating {0} match icons'.format(len(missing)))
+        self._thread = threading.Thread(target=self._generate_all, args=(missing, lock), name='icons')
+        self._thread.start()
+        return len(missing)
+
+    def wait(self, timeout=None):
+        """Wait for started generation, return number of generated icons"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self._generated
+
+    def _generate_all(self, missing, lock):
+        deadline = time.monotonic() + self._time_limit
+        try:
+            with ThreadPoolExecutor(max_workers=min(self._workers, len(missing)), thread_name_prefix='icon') as executor:
+                results = list(executor.map(lambda item: self._generate(item[0], item[1], deadline), missing.items()))
+            self._generated = sum(results)
+            log('Generated {0} of {1} match icons'.format(self._generated, len(missing)))
+        finally:
+            lock.release()
+
+    def _generate(self, filename, logos, deadline):
+        if time.monotonic() > deadline:  # the rest is generated next time
+            return False
+        icon_path = self._kodi_helper.get_tmp_path(filename)
+        if icon_path is None or not self._kodi_helper.generate_icon(logos[0], logos[1], icon_path):
+            return False
+        self._kodi_helper.get_ready_icons().add(filename)
+        return True
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime, timedelta
+from importlib.util import find_spec
 import time
 import os
 import fnmatch
+import threading
 from urllib.parse import parse_qs, urlencode
 import xbmc
 import xbmcaddon
@@ -11,15 +13,17 @@ from .tipsport_exceptions import StrangeXBMCException
 from .site import Site
 from .user_data import UserData
 from .utils import log
-try:
-    from PIL import Image
-    CAN_GENERATE_LOGOS = True
-except Exception:
-    CAN_GENERATE_LOGOS = False
+from .logo_index import LogoIndex
+from .icon_compositor import get_icon_filename
+from .tracing import traced
+CAN_GENERATE_LOGOS = None  # unknown until first needed, PIL itself is imported only to generate an icon
 
 LAST_SHOW_DIALOG_FILENAME = 'DIALOG_SHOWN.time'
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
 DIALOG_INTERVAL = timedelta(days=60)
+DEFAULT_PROGRAM_CACHE_MINUTES = 2
+DEFAULT_PROGRAM_DAYS = 1
+TIPSPORT_STORAGE_KEY = 'tsg'
 LOGO_BASEPATH = 'LOGOS'
 LOGOS = {  # CZ Tipsport
     u'České Budějovice': u'ceske_budejovice',
@@ -79,6 +83,11 @@ class KodiHelper:
     """Store all the configuration data from Kodi"""
     def __init__(self, plugin_handle=None, args=None, base_url=None):
         addon = self.get_addon()
+        self._addon = addon  # Addon() is a call into Kodi, one instance is used for the whole invocation
+        self._local_strings = {}
+        self._language = None
+        self._logo_index = None
+        self._ready_icons = None
         self.plugin_handle = plugin_handle
         self.args = parse_qs(args)
         self.base_url = base_url
@@ -91,21 +100,33 @@ class KodiHelper:
         if not xbmcvfs.exists(self.tmp_path):
             xbmcvfs.mkdirs(self.tmp_path)
         self.version = addon.getAddonInfo('version')
+        self.storage_id = '{0}_{1}'.format(self.plugin_name, self.version)
         self.user_data = UserData(addon.getSetting('username'), addon.getSetting('password'), self.__get_site(addon))
         self.send_crash_reports = addon.getSetting('send_crash_reports') == 'true'
         self.show_all_matches = addon.getSetting('show_all_matches') == 'true'
         self.put_all_matches_in_folders = addon.getSetting('folder_structure_all_matches') == 'true'
         self.icon = addon.getAddonInfo('icon')
         self.can_generate_logos_settings = addon.getSetting('generate_logos') == 'true'
+        self.program_cache_ttl = self.__get_int_setting(addon, 'program_cache_ttl', DEFAULT_PROGRAM_CACHE_MINUTES) * 60
+        self.program_days = self.__get_int_setting(addon, 'program_days', DEFAULT_PROGRAM_DAYS)
+        self.background_service = addon.getSetting('background_service') == 'true'
+        self.trace = addon.getSetting('trace') == 'true'
 
     @property
     def can_generate_logos(self):
-        return CAN_GENERATE_LOGOS and self.can_generate_logos_settings
+        return self.can_generate_logos_settings and is_pil_available()
 
     @staticmethod
     def __get_site(addon):
         return Site.parse(addon.getSetting('site'))
 
+    @staticmethod
+    def __get_int_setting(addon, setting_id, default):
+        try:
+            return int(addon.getSetting(setting_id))
+        except ValueError:
+            return default
+
     @staticmethod
     def get_addon():
         try:
@@ -147,24 +168,34 @@ class KodiHelper:
         return value if value is None else value[0]
 
     def get_local_string(self, string_id):
-        src = xbmc if string_id < 30000 else self.get_addon()
-        localized_string = src.getLocalizedString(string_id)
+        """Localized string (every id is asked from Kodi only once per invocation)"""
+        localized_string = self._local_strings.get(string_id)
+        if localized_string is None:
+            src = xbmc if string_id < 30000 else self._addon
+            localized_string = src.getLocalizedString(string_id)
+            self._local_strings[string_id] = localized_string
         return localized_string
 
+    @property
+    def language(self):
+        """ISO 639-1 code of Kodi language"""
+        if self._language is None:
+            self._language = xbmc.getLanguage(xbmc.ISO_639_1)
+        return self._language
+
     def get_media(self, name):
         return os.path.join(self.media_path, name)
 
+    @property
+    def logo_index(self):
+        if self._logo_index is None:
+            self._logo_index = LogoIndex(self.get_media(LOGO_BASEPATH), self.addon_data_path, self.version)
+        return self._logo_index
+
     def get_logo(self, name, first=True):
-        result = []
-        dirs = [self.get_media(LOGO_BASEPATH)]
-        while len(dirs) > 0:
-            path = dirs.pop(0)
-            folders, files = xbmcvfs.listdir(path)
-            dirs.extend([os.path.join(path, folder) for folder in folders])
-            result.extend([os.path.join(path, f) for f in fnmatch.filter(files, name)])
-            if first and len(result) > 0:
-                return result[0]
-        return result
+        if first:
+            return self.logo_index.get(name) or []
+        return self.logo_index.find(name)
 
     def get_tmp_path(self, name):
         try:
@@ -174,41 +205,62 @@ class KodiHelper:
             CAN_GENERATE_LOGOS = False
             return None
 
-    def get_match_icon(self, name_1, name_2, is_competition_with_logo):
+    def get_match_logos(self, name_1, name_2, is_competition_with_logo):
+        """Logo names of both teams if icon of the match can be generated (None otherwise)"""
         if not is_competition_with_logo:
             return None
         if not self.can_generate_logos or name_1 not in LOGOS or name_2 not in LOGOS:
             return None
-        filename = '_' + LOGOS[name_1] + '_VS_' + LOGOS[name_2] + ".png"
-        path = self.get_tmp_path(filename)
-        if path is None:
+        return LOGOS[name_1], LOGOS[name_2]
+
+    def get_match_icon(self, name_1, name_2, is_competition_with_logo):
+        """Path of generated icon of the match, None if it is not generated (yet), icons are generated by IconPipeline"""
+        logos = self.get_match_logos(name_1, name_2, is_competition_with_logo)
+        if logos is None:
             return None
-        logo_exists = xbmcvfs.exists(path)
-        if logo_exists or (not logo_exists and self.generate_icon(LOGOS[name_1], LOGOS[name_2], path)):
-            return path
-        else:
+        filename = get_icon_filename(*logos)
+        if filename not in self.get_ready_icons():
             return None
+        return self.get_tmp_path(filename)
+
+    def get_ready_icons(self):
+        """File names of generated match icons (temporary directory is listed only once)"""
+        if self._ready_icons is None:
+            _, files = xbmcvfs.listdir(self.tmp_path)
+            self._ready_icons = set(fnmatch.filter(files, '_*.png'))
+        return self._ready_icons
 
+    @traced('generate_icon')
     def generate_icon(self, name_1, name_2, path):
+        """Generate icon under temporary name and rename it, so nobody sees a half written icon"""
+        tmp_path = '{0}.tmp{1}-{2}'.format(path, os.getpid(), threading.get_ident())
         try:
-            images = list(
-                map(Image.open,
-                    [self.get_logo('vs.png'),
-                     self.get_logo(name_1 + '.png'),
-                     self.get_logo(name_2 + '.png')]))
-            new_img = Image.new('RGB', (images[0].width, images[0].height))
-            new_img.putalpha(0)
-            new_img.paste(images[1], (0, 0), images[1])
-            new_img.paste(images[2], (int(images[0].width / 2), 0), images[2])
-            new_img.paste(images[0], (0, 0), images[0])
-            new_img.save(path)
+            from .icon_compositor import get_compositor
+            get_compositor().save(self.get_logo('vs.png'),
+                                  self.get_logo(name_1 + '.png'),
+                                  self.get_logo(name_2 + '.png'),
+                                  tmp_path)
+            os.replace(tmp_path, path)
             log('Saved ({0})'.format(path))
             return True
         except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return False
 
     def remove_tmp_logos(self):
         log('Removing old match logos')
         _, logos = xbmcvfs.listdir(self.tmp_path)
-        for logo in fnmatch.filter(logos, '_*.png'):
+        for logo in fnmatch.filter(logos, '_*.png') + fnmatch.filter(logos, '_*.png.tmp*'):
             xbmcvfs.delete(os.path.join(self.tmp_path, logo))
+
+
+def is_pil_available():
+    """Check PIL can be imported without importing it (importing PIL is slow)"""
+    global CAN_GENERATE_LOGOS
+    if CAN_GENERATE_LOGOS is None:
+        try:
+            CAN_GENERATE_LOGOS = find_spec('PIL') is not None
+        except (ImportError, ValueError):
+            CAN_GENERATE_LOGOS = False
+    return CAN_GENERATE_LOGOS
@@ -0,0 +1,73 @@
+# coding=utf-8
+import json
+import os
+import time
+from os import path, makedirs
+from .utils import log
+
+LOGIN_DESCRIPTOR_FILENAME = 'login.descriptor'
+REFRESH_AGE = 12 * 60 * 60  # seconds, older descriptor is downloaded again after a listing or by the service
+
+
+class LoginDescriptorCache:
+    """
+    Login request descriptor from the login provider (url, post data template with placeholders, headers)
+
+    Descriptor is the same for every login, so it is stored in addon_data_path and used until login with it
+    fails or addon version changes, however old it is. Older than REFRESH_AGE is just downloaded again
+    in background (see needs_refresh). It contains no credentials.
+    """
+    def __init__(self, addon_data_path, addon_version):
+        self._addon_data_path = addon_data_path
+        self._descriptor_path = path.join(addon_data_path, LOGIN_DESCRIPTOR_FILENAME)
+        self._addon_version = addon_version
+        self._entry = None
+
+    def get(self):
+        """Return stored descriptor or None if there is no usable one"""
+        entry = self._get_entry()
+        return entry['descriptor'] if entry is not None else None
+
+    def needs_refresh(self):
+        entry = self._get_entry()
+        return entry is None or self._get_age(entry) > REFRESH_AGE
+
+    def put(self, descriptor):
+        self._entry = {'time': time.time(), 'addon_version': self._addon_version, 'descriptor': descriptor}
+        try:
+            makedirs(self._addon_data_path, exist_ok=True)
+            tmp_path = self._descriptor_path + '.tmp{0}'.format(os.getpid())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entry, f)
+            os.replace(tmp_path, self._descriptor_path)
+        except OSError as e:
+            log('Unable to save login descriptor: {0}'.format(e))
+
+    def invalidate(self):
+        self._entry = None
+        try:
+            os.remove(self._descriptor_path)
+        except OSError:
+            pass
+
+    def _get_entry(self):
+        if self._entry is None:
+            self._entry = self._load()
+        if self._entry is None or self._entry.get('addon_version') != self._addon_version:
+            return None
+        return self._entry
+
+    @staticmethod
+    def _get_age(entry):
+        age = time.time() - entry['time']
+        return age if age >= 0 else REFRESH_AGE + 1  # clock went back, do not trust it
+
+    def _load(self):
+        try:
+            with open(self._descriptor_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if isinstance(entry, dict) and 'time' in entry and isinstance(entry.get('descriptor'), dict):
+                return entry
+        except (OSError, ValueError):
+            pass
+        return None
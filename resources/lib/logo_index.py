@@ -0,0 +1,90 @@
+# coding=utf-8
+import fnmatch
+import json
+import os
+from os import path, makedirs
+import xbmcvfs
+from .utils import log
+
+LOGO_INDEX_FILENAME = 'logo.index'
+
+
+class LogoIndex:
+    """
+    Manifest file name -> paths of logos in the logo directory tree
+
+    The tree is walked (breadth-first, like Kodi VFS listing) only when the manifest is missing,
+    was built by other addon version or modification time of some of its directories has changed.
+    Manifest is stored in addon_data_path, the addon directory itself may be read-only.
+    """
+    def __init__(self, logo_path, index_dir, addon_version):
+        self._logo_path = logo_path
+        self._index_dir = index_dir
+        self._index_path = path.join(index_dir, LOGO_INDEX_FILENAME)
+        self._addon_version = addon_version
+        self._logos = None
+
+    def get(self, name):
+        """Return path of the first logo of given file name (None if there is none)"""
+        paths = self._get_logos().get(name)
+        return paths[0] if paths else None
+
+    def find(self, pattern):
+        """Return paths of all logos whose file name matches pattern"""
+        logos = self._get_logos()
+        return [logo for name in fnmatch.filter(logos, pattern) for logo in logos[name]]
+
+    def _get_logos(self):
+        if self._logos is None:
+            index = self._load()
+            if index is None:
+                index = self._build()
+                self._save(index)
+            self._logos = index['logos']
+        return self._logos
+
+    def _load(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(index, dict) or index.get('version') != self._addon_version \
+                or index.get('root') != self._logo_path or not self._is_up_to_date(index.get('mtimes', {})):
+            return None
+        return index
+
+    @staticmethod
+    def _is_up_to_date(mtimes):
+        try:
+            return len(mtimes) > 0 and all(path.getmtime(directory) == mtime for directory, mtime in mtimes.items())
+        except OSError:
+            return False
+
+    def _build(self):
+        log('Building logo index')
+        logos = {}
+        mtimes = {}
+        dirs = [self._logo_path]
+        try:
+            while len(dirs) > 0:
+                directory = dirs.pop(0)
+                mtimes[directory] = path.getmtime(directory)
+                folders, files = xbmcvfs.listdir(directory)
+                dirs.extend([path.join(directory, folder) for folder in folders])
+                for name in files:
+                    logos.setdefault(name, []).append(path.join(directory, name))
+        except OSError as e:
+            log('Unable to list logos: {0}'.format(e))
+            mtimes = {}  # incomplete index is built again next time
+        return {'version': self._addon_version, 'root': self._logo_path, 'mtimes': mtimes, 'logos': logos}
+
+    def _save(self, index):
+        try:
+            makedirs(self._index_dir, exist_ok=True)
+            tmp_path = self._index_path + '.tmp{0}'.format(os.getpid())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            log('Unable to save logo index: {0}'.format(e))
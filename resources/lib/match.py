@@ -1,7 +1,5 @@
 # coding=utf-8
-from datetime import datetime, timedelta
-import _strptime
-import time
+from datetime import date, datetime, timedelta
 
 FULL_NAMES = {
     u'H.Králové': u'Hradec Králové',
@@ -17,12 +15,16 @@ FULL_NAMES = {
     u'Benátky': u'Benátky nad Jizerou',
     u'Č.Budějovice': u'České Budějovice'
 }
+MAX_MATCH_DURATION = timedelta(hours=4)  # match which started earlier is over even if program still marks it live
 
 
 class Match:
     """Class represents one match with additional information"""
     def __init__(self, name, competition, is_competition_with_logo, sport, url, start_time, status, not_started, score,
-                 icon_name, minutes_enable_before_start):
+                 icon_name, minutes_enable_before_start, league=None, match_date=None):
+        """
+        :param match_date: day of the match (today if None), start_time is just HH:MM
+        """
         self.first_team, self.second_team, self.name = self.parse_name(name)
         self.competition = competition
         self.is_competition_with_logo = is_competition_with_logo
@@ -34,19 +36,32 @@ class Match:
         self.score = score
         self.icon_name = icon_name
         self.minutes_enable_before_start = minutes_enable_before_start
+        self.league = league
+        self.match_date = match_date or date.today()
         self.match_time = self.get_match_time()
 
     def get_match_time(self):
-        datetime.now()
-        match_time = datetime(*(time.strptime(self.start_time, '%H:%M')[0:6]))
-        match_time = datetime.now().replace(hour=match_time.hour, minute=match_time.minute, second=0, microsecond=0)
-        return match_time
+        hour, minute = self.start_time.split(':')  # much faster than time.strptime
+        return datetime(self.match_date.year, self.match_date.month, self.match_date.day, int(hour), int(minute))
+
+    def get_start_time_label(self):
+        """Start time for listing (with date if the match is not today)"""
+        if self.match_date == date.today():
+            return self.start_time
+        return '{0}. {1}. {2}'.format(self.match_date.day, self.match_date.month, self.start_time)
 
     def is_stream_enabled(self):
         time_to_start = self.match_time - datetime.now()
-        if time_to_start.days < 0:
-            return True
-        return time_to_start.seconds < timedelta(minutes=self.minutes_enable_before_start).seconds
+        return time_to_start < timedelta(minutes=self.minutes_enable_before_start)
+
+    def is_about_to_start(self):
+        """Match starts within minutes_enable_before_start from now"""
+        time_to_start = self.match_time - datetime.now()
+        return timedelta(0) <= time_to_start <= timedelta(minutes=self.minutes_enable_before_start)
+
+    def is_live(self):
+        """Match is running: program marks it live and it started less than MAX_MATCH_DURATION ago"""
+        return self.started and timedelta(0) <= datetime.now() - self.match_time <= MAX_MATCH_DURATION
 
     @staticmethod
     def get_full_name_if_possible(name):
@@ -0,0 +1,120 @@
+# coding=utf-8
+from .match import Match
+
+ICE_HOCKEY_SPORT_ID = 23
+MINUTES_ENABLE_BEFORE_START = 15
+
+COMPETITIONS = {
+    'CZ_TIPSPORT': frozenset([u'Česká Tipsport extraliga', u'Tipsport extraliga', u'CZ Tipsport extraliga']),
+    'SK_TIPSPORT':
+    frozenset([u'Slovenská Tipsport liga', u'Slovensk\u00E1 Tipsport liga', u'Tipsport Liga', u'Slovenská extraliga']),
+    'CZ_CHANCE': frozenset([u'Česká Chance liga', u'CZ Chance liga'])
+}
+COMPETITIONS_WITH_LOGOS = frozenset([item for sublist in COMPETITIONS.values() for item in sublist])
+COMPETITION_LOGO = {
+    'CZ_TIPSPORT': 'cz_tipsport_logo.png',
+    'SK_TIPSPORT': 'sk_tipsport_logo.png',
+    'CZ_CHANCE': 'cz_chance_liga_logo.png'
+}
+LEAGUE_BY_COMPETITION = {
+    competition: league
+    for league, competitions in COMPETITIONS.items() for competition in competitions
+}
+
+
+class MatchCatalog:
+    """
+    Index of all matches from one program snapshot
+
+    Program entries are put in buckets by sport -> competition and by league (keys of COMPETITIONS),
+    so every folder level is just a dict lookup. Matches of a bucket are created and sorted only
+    when the bucket is listed for the first time, folder levels do not create any match.
+    """
+    def __init__(self, entries):
+        """
+        :param entries: (program match, league, match date) of every match, see create_entries
+        """
+        self._entries = list(entries)
+        self._by_sport = {}
+        self._by_league = {league: [] for league in COMPETITIONS}
+        for entry in self._entries:
+            match, league, _ = entry
+            self._by_sport.setdefault(match['sport'], {}).setdefault(match['competition'], []).append(entry)
+            if league is not None:
+                self._by_league[league].append(entry)
+        self._matches = {}
+
+    @staticmethod
+    def from_program(data, match_date=None):
+        """Build catalog from parsed tv/program response"""
+        return MatchCatalog(MatchCatalog.create_entries(data, match_date))
+
+    @staticmethod
+    def from_days(entries_by_day):
+        """
+        Build catalog from entries of several days (see create_entries)
+        Match listed in more days (e.g. running over midnight) is taken from the first one
+        """
+        entries = {}
+        for day_entries in entries_by_day:
+            for entry in day_entries:
+                entries.setdefault(entry[0]['url'], entry)
+        return MatchCatalog(entries.values())
+
+    @staticmethod
+    def create_entries(data, match_date=None):
+        """Get (program match, league, match date) of every match of parsed tv/program response of one day"""
+        entries = []
+        for sports in data['program']:
+            is_ice_hockey = sports['id'] == ICE_HOCKEY_SPORT_ID
+            for matches_in_timespan in sports['matchesByTimespans']:
+                for match in matches_in_timespan:
+                    league = LEAGUE_BY_COMPETITION.get(match['competition']) if is_ice_hockey else None
+                    entries.append((match, league, match_date))
+        return entries
+
+    @staticmethod
+    def _create_match(match, league, match_date=None, icon_name=None):
+        return Match(name=match['name'],
+                     competition=match['competition'],
+                     is_competition_with_logo=match['competition'] in COMPETITIONS_WITH_LOGOS,
+                     sport=match['sport'],
+                     url=match['url'],
+                     start_time=match['matchStartTime'],
+                     status=match['score']['statusOffer'],
+                     not_started=not match['live'],
+                     score=match['score']['scoreOffer'],
+                     icon_name=icon_name,
+                     minutes_enable_before_start=MINUTES_ENABLE_BEFORE_START,
+                     league=league,
+                     match_date=match_date)
+
+    def _get_bucket_matches(self, key, entries, icon_name=None):
+        """Sorted matches of bucket (created once per catalog)"""
+        matches = self._matches.get(key)
+        if matches is None:
+            matches = sorted([self._create_match(match, league, match_date, icon_name)
+                              for match, league, match_date in entries],
+                             key=lambda match: match.match_time)
+            self._matches[key] = matches
+        return matches
+
+    def get_sports(self):
+        return list(self._by_sport)
+
+    def get_competitions(self, sport):
+        return list(self._by_sport.get(sport, {}))
+
+    def get_matches(self, sport=None, competition=None):
+        """Get sorted matches of given sport and competition (all matches if sport is None)"""
+        if sport is None:
+            return list(self._get_bucket_matches(None, self._entries))
+        competitions = self._by_sport.get(sport, {})
+        if competition is None:
+            return list(self._get_bucket_matches((sport, None), [entry for entries in competitions.values()
+                                                                 for entry in entries]))
+        return list(self._get_bucket_matches((sport, competition), competitions.get(competition, [])))
+
+    def get_league_matches(self, league):
+        """Get sorted ice hockey matches of league (key of COMPETITIONS), they carry logo of the league"""
+        return list(self._get_bucket_matches(league, self._by_league.get(league, []), COMPETITION_LOGO.get(league)))
@@ -4,6 +4,8 @@
 # Author: Roman Miroshnychenko aka Roman V.M.
 # Licence: GPL v.3 <https://www.gnu.org/copyleft/gpl.html>
 
+import base64
+import json
 from collections.abc import MutableMapping
 import xbmcgui
 try:
@@ -11,6 +13,31 @@ try:
 except ImportError:
     import pickle
 
+KEYS_INDEX = '__keys__'
+BULK_KEY = '__bulk__'
+
+
+class PickleCodec(object):
+    """Binary-safe codec: base64 of the highest protocol pickle"""
+    @staticmethod
+    def encode(value):
+        return base64.b64encode(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).decode('ascii')
+
+    @staticmethod
+    def decode(raw_value):
+        return pickle.loads(base64.b64decode(raw_value))
+
+
+class JsonCodec(object):
+    """Compact codec for plain data (dict, list, str, numbers)"""
+    @staticmethod
+    def encode(value):
+        return json.dumps(value, separators=(',', ':'))
+
+    @staticmethod
+    def decode(raw_value):
+        return json.loads(raw_value)
+
 
 class MemStorage(MutableMapping):
     """
@@ -23,6 +50,10 @@ class MemStorage(MutableMapping):
 
     .. note:: Keys are case-insensitive
 
+    Items stored by :meth:`set_many` share one property, so :meth:`get_many`
+    loads all of them with one property read. Every key is stored either
+    in its own property or in the shared one, the key index knows which.
+
     .. warning:: :class:`MemStorage` does not allow to modify mutable objects
         in place! You need to assign them to variables first, modify and
         store them back to a MemStorage instance.
@@ -41,18 +72,17 @@ class MemStorage(MutableMapping):
     :param window_id: the ID of a Kodi Window object where storage contents
         will be stored.
     :type window_id: int
+    :param codec: object with ``encode(value) -> str`` and ``decode(str) -> value``
+        static methods used for stored values (:class:`PickleCodec` by default)
     """
-    def __init__(self, storage_id, window_id=10000):
+    def __init__(self, storage_id, window_id=10000, codec=PickleCodec):
         """
         :type storage_id: str
         :type window_id: int
         """
         self._id = storage_id
         self._window = xbmcgui.Window(window_id)
-        try:
-            self['__keys__']
-        except KeyError:
-            self['__keys__'] = []
+        self._codec = codec
 
     def _check_key(self, key):
         """
@@ -60,13 +90,58 @@ class MemStorage(MutableMapping):
         """
         if not isinstance(key, str):
             raise TypeError('Storage key must be of str type!')
+        if key in (KEYS_INDEX, BULK_KEY):
+            raise KeyError('{0} is reserved key'.format(key))
+
+    def _full_key(self, key):
+        return '{0}__{1}'.format(self._id, key)
+
+    def _load_keys(self):
+        """
+        Key -> True if the item is stored in the shared bulk property
+        Index in other format (e.g. pickled list stored by previous version of the addon) is reset
+
+        :rtype: dict
+        """
+        raw_keys = self._window.getProperty(self._full_key(KEYS_INDEX))
+        if not raw_keys:
+            return {}
+        try:
+            keys = json.loads(raw_keys)
+        except ValueError:
+            keys = None
+        if not isinstance(keys, dict):
+            self._window.clearProperty(self._full_key(KEYS_INDEX))
+            return {}
+        return keys
+
+    def _save_keys(self, keys):
+        self._window.setProperty(self._full_key(KEYS_INDEX), json.dumps(keys, separators=(',', ':'), sort_keys=True))
+
+    def _load_bulk(self):
+        """
+        :rtype: dict
+        """
+        raw_bulk = self._window.getProperty(self._full_key(BULK_KEY))
+        return self._decode(BULK_KEY, raw_bulk) if raw_bulk else {}
+
+    def _save_bulk(self, bulk):
+        if bulk:
+            self._window.setProperty(self._full_key(BULK_KEY), self._codec.encode(bulk))
+        else:
+            self._window.clearProperty(self._full_key(BULK_KEY))
+
+    def _remove_from_bulk(self, key):
+        bulk = self._load_bulk()
+        bulk.pop(key, None)
+        self._save_bulk(bulk)
 
     def _format_contents(self):
         """
         :rtype: str
         """
         lines = []
-        for key, val in self.iteritems():
+        for key, val in self.items():
             lines.append('{0}: {1}'.format(repr(key), repr(val)))
         return ', '.join(lines)
 
@@ -76,47 +151,89 @@ class MemStorage(MutableMapping):
     def __repr__(self):
         return '<simpleplugin.MemStorage object {{{0}}}'.format(self._format_contents())
 
-    def __getitem__(self, key):
+    def _get_raw(self, key):
         self._check_key(key)
-        full_key = '{0}__{1}'.format(self._id, key)
-        raw_item = self._window.getProperty(full_key)
-        if raw_item:
-            return pickle.loads(bytes(raw_item, 'utf-8'))
-        else:
+        return self._window.getProperty(self._full_key(key))
+
+    def _decode(self, key, raw_item):
+        try:
+            return self._codec.decode(raw_item)
+        except Exception:
             raise KeyError(key)
 
+    def __getitem__(self, key):
+        raw_item = self._get_raw(key)
+        if raw_item:
+            return self._decode(key, raw_item)
+        bulk = self._load_bulk()
+        if key in bulk:
+            return bulk[key]
+        raise KeyError(key)
+
     def __setitem__(self, key, value):
         self._check_key(key)
-        full_key = '{0}__{1}'.format(self._id, key)
-        self._window.setProperty(full_key, pickle.dumps(value, protocol=0))
-        if key != '__keys__':
-            keys = self['__keys__']
-            keys.append(key)
-            self['__keys__'] = keys
+        keys = self._load_keys()
+        self._window.setProperty(self._full_key(key), self._codec.encode(value))
+        if keys.get(key) is not False:  # key index is written only if membership changes
+            if keys.get(key):
+                self._remove_from_bulk(key)
+            keys[key] = False
+            self._save_keys(keys)
 
     def __delitem__(self, key):
         self._check_key(key)
-        full_key = '{0}__{1}'.format(self._id, key)
-        item = self._window.getProperty(full_key)
-        if item:
-            self._window.clearProperty(full_key)
-            if key != '__keys__':
-                keys = self['__keys__']
-                keys.remove(key)
-                self['__keys__'] = keys
-        else:
+        keys = self._load_keys()
+        if key not in keys:
             raise KeyError(key)
+        if keys.pop(key):
+            self._remove_from_bulk(key)
+        else:
+            self._window.clearProperty(self._full_key(key))
+        self._save_keys(keys)
 
     def __contains__(self, key):
         self._check_key(key)
-        full_key = '{0}__{1}'.format(self._id, key)
-        item = self._window.getProperty(full_key)
-        if item:
-            return True
-        return False
+        return key in self._load_keys()
 
     def __iter__(self):
-        return iter(self['__keys__'])
+        return iter(self._load_keys())
 
     def __len__(self):
-        return len(self['__keys__'])
+        return len(self._load_keys())
+
+    def get_many(self, keys):
+        """
+        Get all stored values for given keys (missing keys are skipped)
+        Items stored by set_many are loaded with one property read
+
+        :rtype: dict
+        """
+        bulk = self._load_bulk()
+        result = {}
+        for key in keys:
+            if key in bulk:
+                result[key] = bulk[key]
+            else:
+                raw_item = self._get_raw(key)
+                if raw_item:
+                    result[key] = self._decode(key, raw_item)
+        return result
+
+    def set_many(self, mapping):
+        """
+        Store all items of mapping into one shared property (encoded at once) with single update of the key index
+
+        :type mapping: dict
+        """
+        for key in mapping:
+            self._check_key(key)
+        keys = self._load_keys()
+        bulk = self._load_bulk()
+        bulk.update(mapping)
+        self._save_bulk(bulk)
+        for key in mapping:
+            if keys.get(key) is False:
+                self._window.clearProperty(self._full_key(key))
+        if any(not keys.get(key) for key in mapping):
+            keys.update(dict.fromkeys(mapping, True))
+            self._save_keys(keys)
@@ -0,0 +1,119 @@
+# coding=utf-8
+import json
+import os
+import threading
+import time
+from os import path, makedirs
+from .utils import log
+
+PROBE_STATISTICS_FILENAME = 'probe.statistics'
+SKIP_AFTER_FAILURES = 2  # consecutive failures after which the format is not probed
+EXPLORATION_INTERVAL = 24 * 60 * 60  # seconds, skipped format is probed again after this time
+MAX_KEYS = 100  # the least recently used (source, competition) pairs are forgotten
+
+
+class ProbeStatistics:
+    """
+    Outcomes of stream format probes per stream source and competition
+
+    Formats keep their priority order, statistics only demote a format which failed last time
+    and skip a format which failed SKIP_AFTER_FAILURES times in a row, but only for EXPLORATION_INTERVAL,
+    so changes on Tipsport side are picked up. Only outcomes of probes somebody waited for are recorded.
+    Statistics are stored in addon_data_path (or restored from get_state()) and loaded on first use.
+    """
+    def __init__(self, addon_data_path, state=None):
+        self._addon_data_path = addon_data_path
+        self._statistics_path = path.join(addon_data_path, PROBE_STATISTICS_FILENAME)
+        self._entries = state
+        self._lock = threading.Lock()
+
+    def get_state(self):
+        return self._entries
+
+    def get_source(self, competition):
+        """Stream source seen last time for competition (None if unknown)"""
+        return self._get_entries()['sources'].get(competition or '')
+
+    def is_proven(self, stream_format, source, competition):
+        """Return True if the last probe of format for source and competition succeeded"""
+        stats = self._get_entries()['keys'].get(self._get_key(source, competition), {}).get('formats', {})
+        format_stats = stats.get(stream_format)
+        return format_stats is not None and format_stats['successes'] > 0 and format_stats['streak'] == 0
+
+    def order(self, formats, source, competition):
+        """
+        Return formats in their priority order with formats which failed last time moved to the end,
+        formats which keep failing are left out
+        """
+        stats = self._get_entries()['keys'].get(self._get_key(source, competition), {}).get('formats', {})
+        now = time.time()
+        candidates = [stream_format for stream_format in formats
+                      if not self._is_failing(stats.get(stream_format), now)] or list(formats)
+        return sorted(candidates, key=lambda stream_format: stats.get(stream_format, {}).get('streak', 0) > 0)
+
+    def record(self, source, competition, outcomes):
+        """
+        Remember outcomes of probes
+        :param outcomes: list of (format, success)
+        """
+        if not outcomes:
+            return
+        with self._lock:  # streams of more matches are resolved concurrently by the health check
+            entries = self._get_entries()
+            now = time.time()
+            entries['sources'][competition or ''] = source
+            key_stats = entries['keys'].setdefault(self._get_key(source, competition), {'formats': {}})
+            key_stats['time'] = now
+            for stream_format, success in outcomes:
+                stats = key_stats['formats'].setdefault(stream_format, {
+                    'successes': 0,
+                    'failures': 0,
+                    'streak': 0,
+                    'last_failure': 0
+                })
+                if success:
+                    stats['successes'] += 1
+                    stats['streak'] = 0
+                else:
+                    stats['failures'] += 1
+                    stats['streak'] += 1
+                    stats['last_failure'] = now
+            if len(entries['keys']) > MAX_KEYS:
+                oldest = sorted(entries['keys'], key=lambda key: entries['keys'][key]['time'])
+                for key in oldest[:len(entries['keys']) - MAX_KEYS]:
+                    del entries['keys'][key]
+            self._save()
+
+    @staticmethod
+    def _get_key(source, competition):
+        return u'{0}|{1}'.format(source or '', competition or '')
+
+    @staticmethod
+    def _is_failing(stats, now):
+        return stats is not None and stats['streak'] >= SKIP_AFTER_FAILURES and \
+            0 <= now - stats['last_failure'] < EXPLORATION_INTERVAL
+
+    def _get_entries(self):
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self):
+        try:
+            with open(self._statistics_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if isinstance(entries, dict) and 'keys' in entries and 'sources' in entries:
+                return entries
+        except (OSError, ValueError):
+            pass
+        return {'keys': {}, 'sources': {}}
+
+    def _save(self):
+        try:
+            makedirs(self._addon_data_path, exist_ok=True)
+            tmp_path = self._statistics_path + '.tmp{0}'.format(os.getpid())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self._statistics_path)
+        except OSError as e:
+            log('Unable to save probe statistics: {0}'.format(e))
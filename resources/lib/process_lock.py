@@ -0,0 +1,156 @@
+# coding=utf-8
+import hashlib
+import os
+import threading
+import time
+from os import path, makedirs
+from .utils import log
+
+LOCK_TIMEOUT = 30  # seconds, after that the work is done without the lock
+STALE_AGE = 60  # seconds, lock not refreshed for longer was left behind by a killed process
+HEARTBEAT_INTERVAL = 15  # seconds, held lock is refreshed this often, so a slow holder is never taken for stale
+POLL_INTERVAL = 0.05  # seconds
+
+
+class FileLock:
+    """
+    Lock shared by all plugin invocations (Kodi runs every click in its own process)
+
+    Lock is a file created exclusively in addon_data_path, which works on every platform Kodi runs on.
+    Holder refreshes modification time of the lock every HEARTBEAT_INTERVAL, however long the work takes.
+    Lock not refreshed for STALE_AGE is removed: it is renamed first (only one process can do that) and removed
+    only if it is still the file which was found stale. Release removes only the file this lock holds.
+    If the lock cannot be acquired in time, the work is done without it, a stuck process must never block the user.
+    Example:
+        with FileLock(lock_path) as lock:
+            if lock.waited:
+                ...  # other process has just done the work
+    """
+    def __init__(self, lock_path, timeout=LOCK_TIMEOUT):
+        self._lock_path = lock_path
+        self._timeout = timeout
+        self.locked = False
+        self.waited = False
+        self._file_id = None
+        self._state_lock = threading.Lock()  # heartbeat thread and release
+        self._released = threading.Event()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def acquire(self, timeout=None):
+        """Return True if the lock was acquired, set waited if it was held by someone else"""
+        timeout = self._timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while not self._try_acquire():
+            self.waited = True
+            if time.monotonic() >= deadline:
+                log('Lock {0} not acquired in {1} s'.format(path.basename(self._lock_path), timeout))
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def release(self):
+        with self._state_lock:
+            if not self.locked:
+                return
+            self.locked = False
+            self._released.set()
+            if self._is_held():  # not replaced as stale by someone else
+                try:
+                    os.remove(self._lock_path)
+                except OSError:
+                    pass
+
+    def _try_acquire(self):
+        try:
+            makedirs(path.dirname(self._lock_path), exist_ok=True)
+            fd = os.open(self._lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            self._remove_if_stale()
+            return False
+        except OSError as e:
+            log('Unable to create lock {0}: {1}'.format(self._lock_path, e))
+            return False
+        try:
+            os.write(fd, str(os.getpid()).encode('ascii'))
+            self._file_id = _get_file_id(os.fstat(fd))
+        finally:
+            os.close(fd)
+        self.locked = True
+        self._released.clear()
+        threading.Thread(target=self._keep_alive, name='lock heartbeat', daemon=True).start()
+        return True
+
+    def _is_held(self):
+        try:
+            return _get_file_id(os.stat(self._lock_path)) == self._file_id
+        except OSError:
+            return False
+
+    def _keep_alive(self):
+        """Refresh modification time of the held lock until it is released"""
+        while not self._released.wait(HEARTBEAT_INTERVAL):
+            with self._state_lock:
+                if not self.locked or not self._is_held():
+                    return
+                try:
+                    os.utime(self._lock_path)
+                    self._file_id = _get_file_id(os.stat(self._lock_path))
+                except OSError:
+                    pass
+
+    def _remove_if_stale(self):
+        try:
+            stat = os.stat(self._lock_path)
+            if time.time() - stat.st_mtime <= STALE_AGE:
+                return
+            stale_path = '{0}.stale{1}-{2}'.format(self._lock_path, os.getpid(), threading.get_ident())
+            os.rename(self._lock_path, stale_path)
+        except OSError:
+            return  # other process has removed or replaced it
+        try:
+            if _get_file_id(os.stat(stale_path)) == _get_file_id(stat):
+                log('Removing stale lock {0}'.format(self._lock_path))
+            else:  # stale lock was replaced by a fresh one before the rename, put the fresh one back
+                self._restore(stale_path)
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+    def _restore(self, stale_path):
+        try:
+            os.link(stale_path, self._lock_path)  # fails if yet another lock exists
+        except FileExistsError:
+            pass
+        except OSError:  # file system without hard links
+            if not path.exists(self._lock_path):
+                os.rename(stale_path, self._lock_path)
+
+
+def _get_file_id(stat):
+    """Identity of lock file: inode (file index on Windows) and modification time"""
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_lock_path(directory, key):
+    """Lock file of arbitrary key (e.g. url of request)"""
+    return path.join(directory, 'inflight-{0}.lock'.format(hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]))
+
+
+def coalesce(lock_path, fetch, get_shared_result, timeout=LOCK_TIMEOUT):
+    """
+    Run fetch() in one process at a time
+    Process which had to wait calls get_shared_result() to read what the other process has stored
+    (e.g. in disk cache) and calls fetch() itself only if it returns None
+    """
+    with FileLock(lock_path, timeout) as lock:
+        if lock.waited:
+            result = get_shared_result()
+            if result is not None:
+                return result
+        return fetch()
@@ -0,0 +1,144 @@
+# coding=utf-8
+import json
+import os
+import threading
+import time
+from os import path, makedirs
+from .utils import log
+
+PROGRAM_CACHE_FILENAME = 'program.cache'
+DEFAULT_TTL = 120  # seconds
+MAX_AGE = 12 * 60 * 60  # seconds, older entries are not worth revalidating
+
+
+class ProgramCache:
+    """
+    Disk cache of parsed TV program shared between plugin invocations
+
+    Every folder level is a separate Kodi plugin run, so the cache lives in addon_data_path.
+    Entries younger than ttl (in seconds) are served without any request (ttl 0 disables it).
+    Older entries keep their validators (ETag, Last-Modified, body hash) so the program can be
+    fetched conditionally, and they are evicted after MAX_AGE.
+    Entries already in memory are used before touching the disk. Snapshot (see get_state) keeps only
+    validators of entries, program data is always read from the disk.
+    """
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL, entries=None):
+        self._cache_dir = cache_dir
+        self._cache_path = path.join(cache_dir, PROGRAM_CACHE_FILENAME)
+        self._ttl = ttl
+        self._entries = entries
+        self._lock = threading.Lock()  # programs of more days are stored concurrently
+
+    def get_state(self):
+        """Get validators of in-memory entries (without program data) to be stored in a Tipsport snapshot"""
+        if self._entries is None:
+            return None
+        return {key: {name: value for name, value in entry.items() if name != 'data'}
+                for key, entry in self._entries.items() if self._is_usable(entry)}
+
+    def get(self, key):
+        """Return cached program data for key or None if missing or stale"""
+        if self._ttl <= 0:
+            return None
+        entry = self._get_entry(key, self._is_fresh, with_data=True)
+        if entry is None:
+            return None
+        log('Program loaded from cache ({0})'.format(key))
+        return entry['data']
+
+    def get_since(self, key, since):
+        """Return program data for key stored at time since or later (e.g. by other process), None otherwise"""
+        entry = self._get_entry(key, lambda stored: stored['time'] >= since, with_data=True)
+        if entry is None:
+            return None
+        log('Program loaded from cache, stored by other process ({0})'.format(key))
+        return entry['data']
+
+    def get_validators(self, key):
+        """Return headers for conditional request of key"""
+        entry = self._get_entry(key, self._is_usable)
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get_hash(self, key):
+        """Return hash of stored response body of key (None if unknown)"""
+        entry = self._get_entry(key, self._is_usable)
+        return entry.get('hash') if entry is not None else None
+
+    def revalidate(self, key, body_hash=None):
+        """
+        Mark stored entry as fresh again (server answered 304 or sent the same body)
+        Return stored data or None if there is nothing to revalidate
+        """
+        entry = self._get_entry(key, self._is_usable, with_data=True)
+        if entry is None or (body_hash is not None and entry.get('hash') != body_hash):
+            return None
+        log('Program not modified ({0})'.format(key))
+        self.put(key, entry['data'], entry.get('etag'), entry.get('last_modified'), entry.get('hash'))
+        return entry['data']
+
+    def put(self, key, data, etag=None, last_modified=None, body_hash=None):
+        with self._lock:
+            entries = self._evict_old(self._load())
+            entries[key] = {
+                'time': time.time(),
+                'data': data,
+                'etag': etag,
+                'last_modified': last_modified,
+                'hash': body_hash
+            }
+            self._entries = entries
+            self._save(entries)
+
+    def clear(self):
+        self._entries = None
+        try:
+            os.remove(self._cache_path)
+        except OSError:
+            pass
+
+    def _get_entry(self, key, is_valid, with_data=False):
+        """Return valid entry of key, disk is read only if the entry in memory is not valid or lacks data"""
+        entry = (self._entries or {}).get(key)
+        if entry is None or not is_valid(entry) or (with_data and 'data' not in entry):
+            self._entries = self._load()
+            entry = self._entries.get(key)
+        if entry is None or not is_valid(entry) or (with_data and 'data' not in entry):
+            return None
+        return entry
+
+    @staticmethod
+    def _get_age(entry):
+        return time.time() - entry['time']
+
+    def _is_fresh(self, entry):
+        return 0 <= self._get_age(entry) <= self._ttl
+
+    def _is_usable(self, entry):
+        return 0 <= self._get_age(entry) <= MAX_AGE
+
+    def _evict_old(self, entries):
+        return {key: entry for key, entry in entries.items() if self._is_usable(entry)}
+
+    def _load(self):
+        try:
+            with open(self._cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        try:
+            makedirs(self._cache_dir, exist_ok=True)
+            tmp_path = self._cache_path + '.tmp{0}'.format(os.getpid())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(entries))  # json.dump writes in many small chunks, which is several times slower
+            os.replace(tmp_path, self._cache_path)  # readers never see half written file
+        except OSError as e:
+            log('Unable to save program cache: {0}'.format(e))
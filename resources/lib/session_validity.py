@@ -0,0 +1,86 @@
+# coding=utf-8
+import json
+import os
+import time
+from os import path, makedirs
+from .utils import log
+
+VALIDITY_FILENAME = 'session.validity'
+DEFAULT_DURATION = 10 * 60  # seconds
+MAX_DURATION = 60 * 60  # seconds
+LOGIN_DURATION_KEY = 'duration'  # seconds, login/duration responds {"duration": 600}
+MAX_LOGIN_DURATION = 24 * 60 * 60  # seconds, larger value is not in seconds, default is used instead
+
+
+class SessionValidity:
+    """
+    Remember when the Tipsport session was last proven valid and for how long
+
+    Inside that window there is no need to ask Tipsport whether we are still logged in.
+    State is stored next to the session cookies so it survives between plugin invocations.
+    """
+    def __init__(self, addon_data_path, state=None):
+        """
+        :param state: value from get_state() to use instead of loading from disk
+        """
+        self._addon_data_path = addon_data_path
+        self._validity_path = path.join(addon_data_path, VALIDITY_FILENAME)
+        self.valid_since = 0
+        self.valid_until = 0
+        if state is None:
+            self._load()
+        else:
+            self.valid_since, self.valid_until = state
+
+    def get_state(self):
+        return [self.valid_since, self.valid_until]
+
+    def is_valid(self):
+        now = time.time()
+        return self.valid_since <= now < self.valid_until
+
+    def mark_valid(self, duration=DEFAULT_DURATION):
+        self.valid_since = time.time()
+        self.valid_until = self.valid_since + min(duration, MAX_DURATION)
+        self._save()
+
+    def invalidate(self):
+        if self.valid_until == 0:
+            return
+        self.valid_since = 0
+        self.valid_until = 0
+        self._save()
+
+    def _load(self):
+        try:
+            with open(self._validity_path, 'r') as f:
+                data = json.load(f)
+            self.valid_since = data['valid_since']
+            self.valid_until = data['valid_until']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save(self):
+        try:
+            makedirs(self._addon_data_path, exist_ok=True)
+            tmp_path = self._validity_path + '.tmp{0}'.format(os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump({'valid_since': self.valid_since, 'valid_until': self.valid_until}, f)
+            os.replace(tmp_path, self._validity_path)
+        except OSError as e:
+            log('Unable to save session validity: {0}'.format(e))
+
+
+def get_login_duration(response):
+    """
+    Get remaining login duration (in seconds) from login/duration response
+    Return DEFAULT_DURATION if response does not contain it or it is out of range
+    """
+    try:
+        data = json.loads(response.text)
+    except ValueError:
+        return DEFAULT_DURATION
+    duration = data.get(LOGIN_DURATION_KEY) if isinstance(data, dict) else None
+    if isinstance(duration, (int, float)) and not isinstance(duration, bool) and 0 < duration <= MAX_LOGIN_DURATION:
+        return duration
+    return DEFAULT_DURATION
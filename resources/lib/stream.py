@@ -20,6 +20,9 @@ class RTMPStream:
     def is_rtmp(self):
         return True
 
+    def get_state(self):
+        return {'rtmp_url': self._rtmp_url, 'playpath': self._playpath, 'app': self._app, 'live': self._live_stream}
+
 
 class PlainStream:
     """Class represent one stream and store metadata used to generate plain/hls stream link"""
@@ -32,3 +35,13 @@ class PlainStream:
 
     def is_rtmp(self):
         return False
+
+    def get_state(self):
+        return {'url': self._url}
+
+
+def stream_from_state(state):
+    """Create stream from result of get_state()"""
+    if 'rtmp_url' in state:
+        return RTMPStream(state['rtmp_url'], state['playpath'], state['app'], state['live'])
+    return PlainStream(state['url'])
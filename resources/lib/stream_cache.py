@@ -0,0 +1,103 @@
+# coding=utf-8
+import re
+import time
+from urllib.parse import urlsplit, parse_qsl
+from .stream import stream_from_state
+
+DEFAULT_TTL = 5 * 60  # seconds, used when stream link has no expiry
+MAX_TTL = 3 * 60 * 60  # seconds
+EXPIRY_MARGIN = 30  # seconds, do not hand out links which are just about to expire
+REPLAY_INTERVAL = 2 * 60  # seconds, stream played again this soon has probably not played, it is resolved again
+EXPIRY_PARAMETERS = ['expires', 'expiry', 'exp', 'e', 'validto', 'valid_to', 'endtime']
+TOKEN_PARAMETERS = ['hdnts', 'hdnea', 'token', 'auth', 'st']
+TOKEN_EXPIRY_REGEX = re.compile(r'(?:^|[~&,;])(?:exp|expires|e)=(\d{10,13})')
+
+
+class StreamCache:
+    """
+    Resolved streams keyed by stream number
+
+    Expiry of each stream is taken from the auth/expiry parameters of its link,
+    DEFAULT_TTL is used if there are none. Stream handed out for playback again within REPLAY_INTERVAL
+    is dropped, so a dead link with long expiry does not keep coming back.
+    Entries are plain data (see get_state) so they can be shared through MemStorage.
+    """
+    def __init__(self, entries=None, ttl=DEFAULT_TTL):
+        self._entries = dict(entries or {})
+        self._ttl = ttl
+
+    def get(self, stream_number):
+        """Return cached stream or None if missing or expired"""
+        entry = self._entries.get(stream_number)
+        if entry is None or not self._is_valid(entry):
+            return None
+        return stream_from_state(entry['stream'])
+
+    def get_for_playback(self, stream_number):
+        """
+        Return cached stream and remember it was handed out for playback
+        Return None (and drop the stream) if it was handed out less than REPLAY_INTERVAL ago
+        """
+        entry = self._entries.get(stream_number)
+        if entry is None or not self._is_valid(entry):
+            return None
+        now = time.time()
+        if now - entry.get('played', 0) < REPLAY_INTERVAL:
+            self.invalidate(stream_number)
+            return None
+        self._entries[stream_number] = dict(entry, played=now)  # entries given to __init__ are not modified
+        return stream_from_state(entry['stream'])
+
+    def put(self, stream_number, stream):
+        state = stream.get_state()
+        now = time.time()
+        expires = get_link_expiry(state.get('url', ''))
+        if expires is None:
+            expires = now + self._ttl
+        self._entries[stream_number] = {'expires': min(expires - EXPIRY_MARGIN, now + MAX_TTL), 'stream': state}
+
+    def invalidate(self, stream_number):
+        self._entries.pop(stream_number, None)
+
+    def merge(self, entries):
+        """Add valid entries of other cache state (see get_state), the one which expires later wins"""
+        for stream_number, entry in (entries or {}).items():
+            own = self._entries.get(stream_number)
+            if self._is_valid(entry) and (own is None or own['expires'] < entry['expires']):
+                self._entries[stream_number] = entry
+
+    def get_state(self):
+        return {stream_number: entry for stream_number, entry in self._entries.items() if self._is_valid(entry)}
+
+    @staticmethod
+    def _is_valid(entry):
+        return time.time() < entry['expires']
+
+
+def get_link_expiry(link):
+    """
+    Get expiry (unix time) from query of stream link
+    Example:
+        https://host/index.m3u8?hdnts=exp=1700000000~acl=/*~hmac=ab -> 1700000000
+    Return None if link has no known expiry parameter
+    """
+    try:
+        query = parse_qsl(urlsplit(link).query)
+    except ValueError:
+        return None
+    for key, value in query:
+        key = key.lower()
+        if key in EXPIRY_PARAMETERS and value.isdigit():
+            return _to_unix_time(value)
+        if key in TOKEN_PARAMETERS:
+            token_expiry = TOKEN_EXPIRY_REGEX.search(value)
+            if token_expiry:
+                return _to_unix_time(token_expiry.group(1))
+    return None
+
+
+def _to_unix_time(value):
+    timestamp = int(value)
+    if timestamp > 10**12:  # milliseconds
+        timestamp = timestamp / 1000
+    return timestamp
@@ -1,28 +1,47 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from .utils import log
-from .tipsport_exceptions import UnableGetStreamNumberException, TipsportMsg, StreamHasNotStarted, UnableGetStreamMetadataException
+from .tipsport_exceptions import UnableGetStreamNumberException, TipsportMsg, StreamHasNotStarted, UnableGetStreamMetadataException, SessionExpiredException
 from . import stream_strategy as Strategies
+from .tracing import span
+
+MAX_PROBE_WORKERS = 4
+PROBE_FORMATS = ['HLS', 'RTMP', 'RTMP_WITH_HLS', 'OTHER']  # default priority order
+DEFAULT_FORMAT = 'HLS'  # format the started check (request without format) is expected to return
+STREAM_TYPE_FORMATS = {'HLS': 'HLS', 'URL_IMG': 'HLS', 'URL_AGURA': 'HLS', 'RTMP': 'RTMP',
+                       'RTMP_WITH_HLS': 'RTMP_WITH_HLS', 'URL_PERFORM': 'OTHER', 'URL_TVCOM': 'OTHER'}
+MAX_HINTS = 50
 
 
 class StreamStrategyFactory:
-    def __init__(self, session, user_data):
+    def __init__(self, session, user_data, concurrent_probing=True, max_workers=MAX_PROBE_WORKERS, hints=None,
+                 statistics=None):
+        """
+        :param hints: dict stream_number -> format which worked last time (see get_hints)
+        :param statistics: ProbeStatistics used to order probes and to remember their outcomes
+        """
         self._session = session
         self._user_data = user_data
+        self._concurrent_probing = concurrent_probing
+        self._max_workers = max_workers
+        self._hints = dict(hints or {})
+        self._statistics = statistics
 
-    def get_stream_strategy(self, relative_url):
+    def get_hints(self):
+        """Get formats which worked last time (only for the most recent streams)"""
+        return dict(list(self._hints.items())[-MAX_HINTS:])
+
+    def get_stream_strategy(self, relative_url, competition=None):
         stream_number = self._get_stream_number(relative_url)
         base_url = self._user_data.site_mobile + '/rest/offer/v2/live/matches/{stream_number}/stream?deviceType=DESKTOP'.format(
             stream_number=stream_number)
-        if not self._has_stream_started(base_url):
-            raise StreamHasNotStarted()
-        stream_strategy = self._try_hls_strategy(base_url)
-        if stream_strategy:
-            return stream_strategy
-        stream_strategy = self._try_rtmp_strategy(base_url)
-        if stream_strategy:
-            return stream_strategy
-        stream_strategy = self._try_rtmp_with_hls_strategy(base_url)
+        if self._concurrent_probing:
+            stream_format, stream_strategy = self._probe_concurrently(base_url, stream_number, competition)
+        else:
+            stream_format, stream_strategy = self._probe_serially(base_url, stream_number, competition)
         if stream_strategy:
+            self._hints.pop(stream_number, None)
+            self._hints[stream_number] = stream_format
             return stream_strategy
         return Strategies.NoneStrategy(relative_url)
 
@@ -46,59 +65,170 @@ class StreamStrategyFactory:
         # else:
         #     raise UnableGetStreamMetadataException()
 
-    def _try_rtmp_strategy(self, base_url_request):
-        url_request = base_url_request + '&format=RTMP'
-        response = self._session.get(url_request)
+    def _get_probes(self, stream_number, stream_source=None, competition=None):
+        """
+        Format probes in priority order
+        Format which worked last time for this stream goes first, the rest keeps PROBE_FORMATS order,
+        statistics of the stream source and competition only demote or leave out formats failing there
+        """
+        probes = {'HLS': self._try_hls_strategy, 'RTMP': self._try_rtmp_strategy,
+                  'RTMP_WITH_HLS': self._try_rtmp_with_hls_strategy, 'OTHER': self._try_other_strategy}
+        formats = list(PROBE_FORMATS)
+        if self._statistics is not None:
+            formats = self._statistics.order(formats, stream_source, competition)
+        hint = self._hints.get(stream_number)
+        if hint in probes and hint not in formats:
+            formats.append(hint)
+        formats.sort(key=lambda stream_format: stream_format != hint)
+        return [(stream_format, probes[stream_format]) for stream_format in formats]
+
+    def _probe_serially(self, base_url, stream_number, competition):
+        """Return (format, strategy) of the first successful probe"""
+        stream_source, stream_type, data = self._get_stream_info(base_url)
+        if stream_type == 'INF':
+            raise StreamHasNotStarted()
+        started_format = STREAM_TYPE_FORMATS.get(stream_type)
+        outcomes = []
         try:
-            stream_source, stream_type, data = self._parse_stream_info_response(response)
-            if stream_type == 'RTMP' and data is not None:
-                return Strategies.RTMPStreamStrategy(data)
-            log('Unknown RTMP stream_type: ' + stream_type + ', stream_source: ' + stream_source)
-        except Exception:
-            pass
-        return None
+            for stream_format, probe in self._get_probes(stream_number, stream_source, competition):
+                if stream_format == started_format:  # started check has already answered this probe
+                    stream_strategy = self._get_strategy(stream_format, stream_source, stream_type, data)
+                else:
+                    stream_strategy = probe(base_url)
+                outcomes.append((stream_format, stream_strategy is not None))
+                if stream_strategy:
+                    return stream_format, stream_strategy
+            return None, None
+        finally:
+            self._record_outcomes(stream_source, competition, outcomes)
 
-    def _try_hls_strategy(self, base_url_request):
-        url_request = base_url_request + '&format=HLS'
-        response = self._session.get(url_request)
+    def _probe_concurrently(self, base_url, stream_number, competition):
+        """
+        Send the started check together with probes up to the first format which worked last time,
+        the rest is sent only if those fail.
+        The started check (request without format) answers the probe of the format it returns, so the
+        probe of DEFAULT_FORMAT is sent only if the started check returns other format.
+        Stream source is known only from the started check, so probes are ordered by the source
+        seen last time for the competition.
+        Winner is chosen by probe priority, not by the first response. Only outcomes of probes
+        which were waited for are recorded, lower priority probes which finished meanwhile are not.
+        Return (format, strategy) of the winning probe
+        """
+        guessed_source = self._statistics.get_source(competition) if self._statistics is not None else None
+        probes = self._get_probes(stream_number, guessed_source, competition)
+        batch_size = self._get_probe_batch_size(probes, stream_number, guessed_source, competition)
+        executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        probe_futures = {}
+        stream_source = None
+        outcomes = []
         try:
-            stream_source, stream_type, data = self._parse_stream_info_response(response)
-            if stream_type == 'HLS':
-                return Strategies.HLSStreamStrategy(self._session, data)
-            if stream_type == 'URL_IMG':
-                return Strategies.UrlImgStreamStrategy(self._session, data)
-            if stream_type == 'URL_AGURA':
-                return Strategies.UrlAguraStrategy(self._session, data)
-            log('Unknown HLS stream_type: ' + stream_type + ', stream_source: ' + stream_source)
-        except Exception:
-            pass
-        return None
+            started_future = executor.submit(self._get_stream_info, base_url)
+            self._submit_probes(executor, probe_futures, base_url, probes[:batch_size], DEFAULT_FORMAT)
+            stream_source, stream_type, data = started_future.result()
+            if stream_type == 'INF':
+                stream_source = None  # probes failed just because the match has not started, nothing to record
+                raise StreamHasNotStarted()
+            started_format = STREAM_TYPE_FORMATS.get(stream_type)
+            for index, (stream_format, _) in enumerate(probes):
+                if stream_format == started_format:  # started check has already answered this probe
+                    stream_strategy = self._get_strategy(stream_format, stream_source, stream_type, data)
+                else:
+                    if stream_format not in probe_futures:  # probes sent so far failed, send the next batch
+                        self._submit_probes(executor, probe_futures, base_url,
+                                            probes[index:max(batch_size, index + 1)], started_format)
+                    stream_strategy = probe_futures[stream_format].result()
+                outcomes.append((stream_format, stream_strategy is not None))
+                if stream_strategy:
+                    return stream_format, stream_strategy
+            return None, None
+        finally:
+            for future in probe_futures.values():
+                future.cancel()
+            if stream_source is not None:
+                self._record_outcomes(stream_source, competition, outcomes)
+            executor.shutdown(wait=False)
 
-    def _try_rtmp_with_hls_strategy(self, base_url_request):
-        url_request = base_url_request + '&format=RTMP_WITH_HLS'
-        response = self._session.get(url_request)
+    def _submit_probes(self, executor, probe_futures, base_url, probes, answered_format):
+        """Send probes which were not sent yet, except the one answered by the started check"""
+        for stream_format, probe in probes:
+            if stream_format != answered_format and stream_format not in probe_futures:
+                probe_futures[stream_format] = executor.submit(probe, base_url)
+
+    def _get_probe_batch_size(self, probes, stream_number, stream_source, competition):
+        """Number of probes sent at once: up to the first format which worked last time"""
+        hint = self._hints.get(stream_number)
+        for index, (stream_format, _) in enumerate(probes):
+            if stream_format == hint or (self._statistics is not None and
+                                         self._statistics.is_proven(stream_format, stream_source, competition)):
+                return index + 1
+        return len(probes)
+
+    def _record_outcomes(self, stream_source, competition, outcomes):
+        if self._statistics is not None:
+            self._statistics.record(stream_source, competition, outcomes)
+
+    def _try_strategy(self, base_url_request, stream_format, get_strategy):
+        url_request = base_url_request + '&format=' + stream_format
+        with span('probe ' + stream_format):
+            response = self._session.get(url_request)
+            try:
+                stream_source, stream_type, data = self._parse_stream_info_response(response)
+                return get_strategy(stream_source, stream_type, data)
+            except Exception:
+                pass
+            return None
+
+    def _get_strategy(self, stream_format, stream_source, stream_type, data):
+        """Strategy of format from already received stream info (None if it is not usable)"""
+        get_strategy = {'HLS': self._get_hls_strategy, 'RTMP': self._get_rtmp_strategy,
+                        'RTMP_WITH_HLS': self._get_rtmp_with_hls_strategy, 'OTHER': self._get_other_strategy}
         try:
-            stream_source, stream_type, data = self._parse_stream_info_response(response)
-            if stream_type == 'RTMP_WITH_HLS':
-                url = data.split('###')[1]
-                return Strategies.HLSStreamStrategy(self._session, url)
-            log('Unknown RTMP_WITH_HLS stream_type: ' + stream_type + ', stream_source: ' + stream_source)
+            return get_strategy[stream_format](stream_source, stream_type, data)
         except Exception:
-            pass
-        return None
+            return None
+
+    def _try_rtmp_strategy(self, base_url_request):
+        return self._try_strategy(base_url_request, 'RTMP', self._get_rtmp_strategy)
+
+    def _try_hls_strategy(self, base_url_request):
+        return self._try_strategy(base_url_request, 'HLS', self._get_hls_strategy)
+
+    def _try_rtmp_with_hls_strategy(self, base_url_request):
+        return self._try_strategy(base_url_request, 'RTMP_WITH_HLS', self._get_rtmp_with_hls_strategy)
 
     def _try_other_strategy(self, base_url_request):
-        url_request = base_url_request + '&format=OTHER'
-        response = self._session.get(url_request)
-        try:
-            stream_source, stream_type, data = self._parse_stream_info_response(response)
-            if stream_type == 'URL_PERFORM':
-                return Strategies.UrlPerformeStreamStrategy(self._session, data)
-            if stream_type == 'URL_TVCOM':
-                return Strategies.TvComStreamStrategy(self._session, data)
-            log('Unknown OTHER stream_type: ' + stream_type + ', stream_source: ' + stream_source)
-        except Exception:
-            pass
+        return self._try_strategy(base_url_request, 'OTHER', self._get_other_strategy)
+
+    @staticmethod
+    def _get_rtmp_strategy(stream_source, stream_type, data):
+        if stream_type == 'RTMP' and data is not None:
+            return Strategies.RTMPStreamStrategy(data)
+        log('Unknown RTMP stream_type: ' + stream_type + ', stream_source: ' + stream_source)
+        return None
+
+    def _get_hls_strategy(self, stream_source, stream_type, data):
+        if stream_type == 'HLS':
+            return Strategies.HLSStreamStrategy(self._session, data)
+        if stream_type == 'URL_IMG':
+            return Strategies.UrlImgStreamStrategy(self._session, data)
+        if stream_type == 'URL_AGURA':
+            return Strategies.UrlAguraStrategy(self._session, data)
+        log('Unknown HLS stream_type: ' + stream_type + ', stream_source: ' + stream_source)
+        return None
+
+    def _get_rtmp_with_hls_strategy(self, stream_source, stream_type, data):
+        if stream_type == 'RTMP_WITH_HLS':
+            url = data.split('###')[1]
+            return Strategies.HLSStreamStrategy(self._session, url)
+        log('Unknown RTMP_WITH_HLS stream_type: ' + stream_type + ', stream_source: ' + stream_source)
+        return None
+
+    def _get_other_strategy(self, stream_source, stream_type, data):
+        if stream_type == 'URL_PERFORM':
+            return Strategies.UrlPerformeStreamStrategy(self._session, data)
+        if stream_type == 'URL_TVCOM':
+            return Strategies.TvComStreamStrategy(self._session, data)
+        log('Unknown OTHER stream_type: ' + stream_type + ', stream_source: ' + stream_source)
         return None
 
     # def _get_stream_source_type_and_data(self, relative_url):
@@ -118,10 +248,10 @@ class StreamStrategyFactory:
     #     except (TypeError, KeyError):
     #         raise UnableGetStreamMetadataException()
 
-    def _has_stream_started(self, base_url):
-        response = self._session.get(base_url)
-        _, stream_type, _ = self._parse_stream_info_response(response)
-        return stream_type != 'INF'
+    def _get_stream_info(self, base_url):
+        with span('stream info'):
+            response = self._session.get(base_url)
+        return self._parse_stream_info_response(response)
 
     @staticmethod
     def _get_stream_number(relative_url):
@@ -141,6 +271,8 @@ class StreamStrategyFactory:
 
     @staticmethod
     def _parse_stream_info_response(response):
+        if response.status_code in [401, 403]:
+            raise SessionExpiredException()
         try:
             data = json.loads(response.text)
             if 'displayRules' not in data:
@@ -70,3 +70,8 @@ class NeedPluginUpdateException(TpgException):
 class UnableToUpdateCodeFromGit(TpgException):
     def __init__(self, message="Updating addon from github.com failed"):
         super(UnableToUpdateCodeFromGit, self).__init__(message)
+
+
+class SessionExpiredException(TpgException):
+    def __init__(self, message="Tipsport session has expired"):
+        super(SessionExpiredException, self).__init__(message)
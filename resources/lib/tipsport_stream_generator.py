@@ -1,60 +1,165 @@
 # coding=utf-8
 import json
-import requests
+import hashlib
+import os
 import pickle
+import threading
+import time
+from datetime import date, timedelta
 from os import path, makedirs
 from . import tipsport_exceptions as Exceptions
-from .match import Match
-from .utils import log, get_host_info
-from .stream_strategy_factory import StreamStrategyFactory
+from .match_catalog import MatchCatalog, COMPETITIONS
+from .utils import log, get_host_info, get_stream_number
+from .program_cache import ProgramCache
+from .session_validity import SessionValidity, get_login_duration
+from .stream_cache import StreamCache
+from .login_descriptor_cache import LoginDescriptorCache
+from .probe_statistics import ProbeStatistics
+from .process_lock import FileLock, coalesce, get_lock_path
+from .tracing import span, traced
 
 COOKIES_FILENAME = 'session.cookies'
-
-COMPETITIONS = {
-    'CZ_TIPSPORT': [u'Česká Tipsport extraliga', u'Tipsport extraliga', u'CZ Tipsport extraliga'],
-    'SK_TIPSPORT':
-    [u'Slovenská Tipsport liga', u'Slovensk\u00E1 Tipsport liga', u'Tipsport Liga', u'Slovenská extraliga'],
-    'CZ_CHANCE': [u'Česká Chance liga', u'CZ Chance liga']
-}
-COMPETITIONS_WITH_LOGOS = [item for sublist in COMPETITIONS.values() for item in sublist]
-COMPETITION_LOGO = {
-    'CZ_TIPSPORT': 'cz_tipsport_logo.png',
-    'SK_TIPSPORT': 'sk_tipsport_logo.png',
-    'CZ_CHANCE': 'cz_chance_liga_logo.png'
-}
+LOGIN_LOCK_FILENAME = 'login.lock'
+LOGIN_DESCRIPTOR_LOCK_FILENAME = 'login.descriptor.lock'
+PROGRAM_FETCH_TIMEOUT = 25  # seconds, how long to wait for program fetched by other process
+STATE_VERSION = 2
+PROGRAM_URL = '/rest/articles/v1/tv/program?day={day}&articleId='
+MAX_PROGRAM_WORKERS = 4
+LOGIN_PROVIDER_URL = 'https://tipsportloginprovider.azurewebsites.net/api/get_login_request'
+LOGIN_PROVIDER_TIMEOUT = (5, 10)  # seconds (connect, read), login waits for it
+LOGIN_REQUEST_VERSION = 1
+LOGIN_DESCRIPTOR_KEYS = ['version', 'url', 'post_data', 'username_keyword', 'password_keyword', 'headers']
 
 AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/97.0.4692.99 Safari/537.36 OPR/83.0.4254.27"
 
 
 class Tipsport:
     """Class providing communication with Tipsport site"""
-    def __init__(self, kodi_helper, clean_function=None):
-        self.session = Tipsport._get_session(kodi_helper.addon_data_path)
+    def __init__(self, kodi_helper, clean_function=None, state=None):
+        """
+        :param state: snapshot from get_state() to restore instead of loading session from disk
+        """
+        state = state or {}
+        self._session = None
+        self._cookies = state.get('cookies')
         self.logged_in = False
         self.kodi_helper = kodi_helper
         self.user_data = kodi_helper.user_data
         self.lib_path = kodi_helper.lib_path
-        self.stream_strategy_factory = StreamStrategyFactory(self.session, self.user_data)
+        self._stream_strategy_factory = None
+        self._strategy_hints = state.get('strategy_hints')
+        self.program_cache = ProgramCache(kodi_helper.addon_data_path,
+                                          kodi_helper.program_cache_ttl,
+                                          entries=state.get('program'))
+        self.session_validity = SessionValidity(kodi_helper.addon_data_path, state=state.get('session_validity'))
+        self.stream_cache = StreamCache(state.get('streams'))
+        self.login_descriptor_cache = LoginDescriptorCache(kodi_helper.addon_data_path, kodi_helper.version)
+        self.probe_statistics = ProbeStatistics(kodi_helper.addon_data_path, state=state.get('probe_statistics'))
+        self._login_lock = threading.RLock()
+        self._match_catalog = None
+        self._match_catalog_versions = None
+        self._day_entries = {}
         if clean_function is not None:
             clean_function()
 
     @staticmethod
-    def _get_session(addon_data_path):
-        session = requests.session()
+    def from_state(kodi_helper, state):
+        """Rebuild Tipsport from get_state() snapshot. Return None if snapshot is missing or outdated"""
+        if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+            return None
+        return Tipsport(kodi_helper, state=state)
+
+    def get_state(self):
+        """Get small versioned snapshot of everything needed to rebuild this instance"""
+        return {
+            'version': STATE_VERSION,
+            'cookies': self._get_cookies_state(),
+            'session_validity': self.session_validity.get_state(),
+            'program': self.program_cache.get_state(),
+            'strategy_hints': self._get_strategy_hints(),
+            'probe_statistics': self.probe_statistics.get_state(),
+            'streams': self.stream_cache.get_state()
+        }
+
+    def merge_into_state(self, state):
+        """
+        Get snapshot of other Tipsport instance (see get_state) with streams and hints of this instance merged in
+        Session and program of the other snapshot are kept, it was saved later by other process
+        """
+        if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+            return self.get_state()
+        streams = StreamCache(state.get('streams'))
+        streams.merge(self.stream_cache.get_state())
+        merged = dict(state)
+        merged['streams'] = streams.get_state()
+        merged['strategy_hints'] = dict(state.get('strategy_hints') or {}, **self._get_strategy_hints())
+        return merged
+
+    @property
+    def session(self):
+        """
+        HTTP session (created on first use)
+        Nothing from requests is imported while everything is served from caches
+        """
+        if self._session is None:
+            with self._login_lock:  # programs of more days are fetched concurrently
+                if self._session is None:
+                    self._session = Tipsport._get_session(self.kodi_helper.addon_data_path, self._cookies)
+        return self._session
+
+    @property
+    def stream_strategy_factory(self):
+        if self._stream_strategy_factory is None:
+            from .stream_strategy_factory import StreamStrategyFactory
+            self._stream_strategy_factory = StreamStrategyFactory(self.session, self.user_data,
+                                                                  hints=self._strategy_hints,
+                                                                  statistics=self.probe_statistics)
+        return self._stream_strategy_factory
+
+    def _get_cookies_state(self):
+        if self._session is None and self._cookies is not None:
+            return self._cookies
+        return [[c.name, c.value, c.domain, c.path, c.secure, c.expires] for c in self.session.cookies]
+
+    def _get_strategy_hints(self):
+        if self._stream_strategy_factory is None:
+            return self._strategy_hints
+        return self._stream_strategy_factory.get_hints()
+
+    @staticmethod
+    def _get_session(addon_data_path, cookies=None):
+        from .http_client import create_session
+        session = create_session()
         Tipsport._set_session_headers(session)
+        if cookies is not None:
+            for name, value, domain, cookie_path, secure, expires in cookies:
+                session.cookies.set(name, value, domain=domain, path=cookie_path, secure=secure, expires=expires)
+            return session
+        Tipsport._load_cookies(session, addon_data_path)
+        return session
+
+    @staticmethod
+    def _load_cookies(session, addon_data_path):
+        """Load cookies saved by save_session. Return True if there were any"""
         cookie_path = path.join(addon_data_path, COOKIES_FILENAME)
-        if path.exists(cookie_path):
+        if not path.exists(cookie_path):
+            return False
+        try:
             with open(cookie_path, 'rb') as f:
                 session.cookies.update(pickle.load(f))
-        return session
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+        return True
 
     def save_session(self):
         try:
             cookie_path = path.join(self.kodi_helper.addon_data_path, COOKIES_FILENAME)
             makedirs(self.kodi_helper.addon_data_path, exist_ok=True)
-            with open(cookie_path, 'wb') as f:
+            tmp_path = cookie_path + '.tmp{0}'.format(os.getpid())
+            with open(tmp_path, 'wb') as f:
                 log(f'cookie_path: {cookie_path}')
                 pickle.dump(self.session.cookies, f)
+            os.replace(tmp_path, cookie_path)  # other processes never load half written cookies
         except FileNotFoundError:
             pass
 
@@ -63,26 +168,55 @@ class Tipsport:
         session.headers['User-Agent'] = AGENT
         session.headers['DNT'] = '1'
 
-    def _get_login_request(self):
+    @traced('login descriptor')
+    def _download_login_descriptor(self):
+        """Get description of login request from login provider"""
         params = {
             'Addon': self.kodi_helper.plugin_name,
             'AddonVersion': self.kodi_helper.version,
-            'RequestVersion': 1,
+            'RequestVersion': LOGIN_REQUEST_VERSION,
             'HostInfo': get_host_info()
         }
-        lr_response = requests.post('https://tipsportloginprovider.azurewebsites.net/api/get_login_request',
-                                    json=params)
+        from .http_client import create_session
+        with create_session(timeout=LOGIN_PROVIDER_TIMEOUT, pool_maxsize=1) as session:  # no Tipsport headers and cookies
+            lr_response = session.post(LOGIN_PROVIDER_URL, json=params)
         if not lr_response.ok:
             raise Exceptions.LoginFailedException()
-        data = json.loads(lr_response.text)
-        if (any([
-                key not in data
-                for key in ['version', 'url', 'post_data', 'username_keyword', 'password_keyword', 'headers']
-        ])):
+        try:
+            data = json.loads(lr_response.text)
+        except ValueError:
             raise Exceptions.LoginFailedException()
-        if data['version'] != 1:
+        if not isinstance(data, dict) or any([key not in data for key in LOGIN_DESCRIPTOR_KEYS]):
+            raise Exceptions.LoginFailedException()
+        if data['version'] != LOGIN_REQUEST_VERSION:
             raise Exceptions.NeedPluginUpdateException()
+        return data
+
+    def _get_login_descriptor(self):
+        """Return (descriptor, True if it is from cache)"""
+        data = self.login_descriptor_cache.get()
+        if data is not None:
+            return data, True
+        data = self._download_login_descriptor()
+        self.login_descriptor_cache.put(data)
+        return data, False
 
+    def refresh_login_descriptor(self):
+        """
+        Download login descriptor again if the stored one is getting old
+        Used by background service and by the plugin once its listing is shown, only one process downloads it
+        """
+        if not self.login_descriptor_cache.needs_refresh():
+            return
+        lock = FileLock(path.join(self.kodi_helper.addon_data_path, LOGIN_DESCRIPTOR_LOCK_FILENAME), timeout=0)
+        if not lock.acquire():  # other process is downloading it
+            return
+        try:
+            self.login_descriptor_cache.put(self._download_login_descriptor())
+        finally:
+            lock.release()
+
+    def _get_login_request(self, data):
         post_data = json.loads(data['post_data'].replace(data['username_keyword'], self.user_data.username).replace(
             data['password_keyword'], self.user_data.password))
         headers = dict(data['headers'])
@@ -90,72 +224,133 @@ class Tipsport:
         for key, value in headers.items():
             fix_headers[key.replace(':', '')] = value
         headers = fix_headers
-        preparedRequest = requests.Request("POST",
-                                           data['url'].replace('tipsport.cz', self.user_data.site_base),
-                                           json=post_data,
-                                           headers=headers,
-                                           cookies=self.session.cookies)
+        from requests import Request
+        preparedRequest = Request("POST",
+                                  data['url'].replace('tipsport.cz', self.user_data.site_base),
+                                  json=post_data,
+                                  headers=headers,
+                                  cookies=self.session.cookies)
         return preparedRequest.prepare()
 
+    @traced('login')
     def login(self):
-        """Login to mobile tipsport site with given credentials"""
+        """
+        Login to mobile tipsport site with given credentials
+        Only one process logs in at a time, process which had to wait reuses session of the one which logged in
+        """
+        lock_path = path.join(self.kodi_helper.addon_data_path, LOGIN_LOCK_FILENAME)
+        with FileLock(lock_path) as lock:
+            if not lock.waited or not self._load_cookies(self.session, self.kodi_helper.addon_data_path):
+                self._login()
+                return
+        if self.is_logged_in():  # checked outside the lock, so waiting processes check at once
+            log('Reusing session of other process')
+            return
+        with FileLock(lock_path):
+            self._login()
+
+    def _login(self):
         self.session.get(self.user_data.site)  # load cookies
+        descriptor, is_cached = self._get_login_descriptor()
+        logged_in = self._send_login_request(descriptor)
+        if not logged_in and is_cached:
+            log('Login with stored login descriptor failed, downloading new one')
+            self.login_descriptor_cache.invalidate()
+            descriptor, _ = self._get_login_descriptor()
+            logged_in = self._send_login_request(descriptor)
+        if not logged_in:
+            raise Exceptions.LoginFailedException()
+        self.save_session()
+
+    def _send_login_request(self, descriptor):
+        """Return True if Tipsport accepted the login"""
         try:
-            login_request = self._get_login_request()
+            login_request = self._get_login_request(descriptor)
             _ = self.session.send(login_request)
         except Exception as e:
             raise e.__class__  # remove tipsport account credentials from traceback
-        if not self.is_logged_in():
-            raise Exceptions.LoginFailedException()
-        self.save_session()
+        return self.is_logged_in()
 
+    @traced('is_logged_in')
     def is_logged_in(self):
         """Check if login was successful"""
         response = self.session.put(self.user_data.site + '/rest/ver1/client/restrictions/login/duration')
         if response.ok:
             log('Is logged in')
+            self.session_validity.mark_valid(get_login_duration(response))
             return True
         log('Is logged out')
+        self.session_validity.invalidate()
         return False
 
+    def get_match_catalog(self):
+        """
+        Get catalog of all matches of program_days days starting today
+        Catalog is built again only if program of some day has changed and only entries of that day are recreated
+        """
+        days = list(range(max(1, self.kodi_helper.program_days)))
+        programs = self._get_programs(days)
+        versions = [self._get_program_version(day, data) for day, data in zip(days, programs)]
+        if self._match_catalog is None or self._match_catalog_versions != versions:
+            with span('match_catalog'):
+                self._match_catalog = MatchCatalog.from_days([
+                    self._get_day_entries(day, data, version) for day, data, version in zip(days, programs, versions)
+                ])
+            self._match_catalog_versions = versions
+        return self._match_catalog
+
+    @traced('get_list_matches')
     def get_list_matches(self, competition_name):
         """Get list of all available ELH matches on tipsport site"""
-        response = self._get_matches_both_menu_response()
-        data = json.loads(response.text)
-        icon_name = COMPETITION_LOGO.get(competition_name)
+        catalog = self.get_match_catalog()
         if competition_name in COMPETITIONS:
-            matches_data = [
-                match for sports in data['program'] if sports['id'] == 23
-                for matchesInTimespan in sports['matchesByTimespans'] for match in matchesInTimespan
-                if match['competition'] in COMPETITIONS[competition_name]
-            ]
+            matches = catalog.get_league_matches(competition_name)
         else:
-            matches_data = [
-                match for sports in data['program'] for matchesInTimespan in sports['matchesByTimespans']
-                for match in matchesInTimespan
-            ]
-        matches = [
-            Match(name=match['name'],
-                  competition=match['competition'],
-                  is_competition_with_logo=match['competition'] in COMPETITIONS_WITH_LOGOS,
-                  sport=match['sport'],
-                  url=match['url'],
-                  start_time=match['matchStartTime'],
-                  status=match['score']['statusOffer'],
-                  not_started=not match['live'],
-                  score=match['score']['scoreOffer'],
-                  icon_name=icon_name,
-                  minutes_enable_before_start=15) for match in matches_data
-        ]
-        matches.sort(key=lambda match: match.match_time)
+            matches = catalog.get_matches()
         log('Matches {0} loaded'.format(competition_name))
         return matches
 
-    def get_stream(self, relative_url):
-        """Get instance of Stream class from given relative link"""
-        self._relogin_if_needed()
-        self._check_alert_message_and_throw_exception()
-        strategy = self.stream_strategy_factory.get_stream_strategy(relative_url)
+    @traced('get_stream')
+    def get_stream(self, relative_url, competition=None):
+        """
+        Get instance of Stream class from given relative link
+        :param competition: competition of the match, used to pick the most promising stream format first
+        """
+        stream_number = get_stream_number(relative_url)
+        stream = self.stream_cache.get(stream_number)
+        if stream is not None:
+            log('Stream loaded from cache ({0})'.format(stream_number))
+            return stream
+        self.relogin_if_needed()
+        try:
+            stream = self._get_stream(relative_url, competition)
+        except Exceptions.SessionExpiredException:
+            self._relogin()
+            stream = self._get_stream(relative_url, competition)
+        self.stream_cache.put(stream_number, stream)
+        return stream
+
+    def _get_stream(self, relative_url, competition=None):
+        """
+        Check alert message and resolve stream concurrently, they are independent requests
+        Exception from the alert check (e.g. TipsportMsg) wins over the result of stream resolution
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            alert_future = executor.submit(self._check_alert_message_and_throw_exception)
+            try:
+                stream = self._resolve_stream(relative_url, competition)
+            except Exception:
+                alert_future.result()
+                raise
+            alert_future.result()
+            return stream
+        finally:
+            executor.shutdown(wait=False)
+
+    def _resolve_stream(self, relative_url, competition=None):
+        strategy = self.stream_strategy_factory.get_stream_strategy(relative_url, competition)
         try:
             stream = strategy.get_stream()
         except Exception:
@@ -164,26 +359,124 @@ class Tipsport:
             raise Exceptions.UnsupportedFormatStreamMetadataException()
         return stream
 
-    def _relogin_if_needed(self):
-        if not self.is_logged_in():
+    def relogin_if_needed(self):
+        """Login only if session was not proven valid recently and Tipsport says we are logged out"""
+        if self.session_validity.is_valid():
+            return
+        with self._login_lock:
+            if self.session_validity.is_valid():  # other thread has just logged in
+                return
+            if not self.is_logged_in():
+                self.login()
+
+    def _relogin(self):
+        expired_at = time.time()
+        with self._login_lock:
+            if self.session_validity.is_valid() and self.session_validity.valid_since >= expired_at:
+                return  # other thread has just logged in again
+            log('Session expired')
+            self.session_validity.invalidate()
             self.login()
 
-    def _get_matches_both_menu_response(self):
-        """Get dwr respond with all matches today"""
-        self._relogin_if_needed()
-        response = self.session.get(self.user_data.site_mobile + '/rest/articles/v1/tv/program?day=0&articleId=')
+    @staticmethod
+    def _is_unauthenticated(response):
+        return response.status_code in [401, 403]
+
+    def _get_programs(self, days):
+        """Get parsed programs of given days (fetched concurrently if there are more of them)"""
+        if len(days) == 1:
+            return [self._get_program_data(days[0])]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(len(days), MAX_PROGRAM_WORKERS)) as executor:
+            return list(executor.map(self._get_program_data, days))
+
+    def _get_program_url(self, day):
+        return self.user_data.site_mobile + PROGRAM_URL.format(day=day)
+
+    def _get_program_version(self, day, data):
+        """Identify content of program of given day (hash of response body if known)"""
+        return [(date.today() + timedelta(days=day)).isoformat(),
+                self.program_cache.get_hash(self._get_program_url(day)) or id(data)]
+
+    def _get_day_entries(self, day, data, version):
+        """Get catalog entries of given day, reuse already created ones if program of that day has not changed"""
+        cached_version, entries = self._day_entries.get(day, (None, None))
+        if cached_version != version:
+            entries = MatchCatalog.create_entries(data, date.today() + timedelta(days=day))
+            self._day_entries[day] = (version, entries)
+        return entries
+
+    def _get_program_data(self, day=0):
+        """
+        Get parsed program of all matches of given day (0 is today)
+        Use cache if possible. Process which finds the same program being downloaded by other process
+        waits for it and reads it from the cache
+        """
+        program_url = self._get_program_url(day)
+        data = self.program_cache.get(program_url)
+        if data is not None:
+            return data
+        started = time.time()
+        return coalesce(get_lock_path(self.kodi_helper.addon_data_path, program_url),
+                        lambda: self._fetch_program_data(program_url),
+                        lambda: self.program_cache.get_since(program_url, started),
+                        PROGRAM_FETCH_TIMEOUT)
+
+    def _fetch_program_data(self, program_url):
+        """
+        Download program (only one process at a time, see _get_program_data)
+        Ask conditionally and reuse cached parse if program has not changed
+        """
+        response = self._get_matches_both_menu_response(program_url, self.program_cache.get_validators(program_url))
+        if response.status_code == 304:
+            data = self.program_cache.revalidate(program_url)
+            if data is not None:
+                return data
+            response = self._get_matches_both_menu_response(program_url)
+        body_hash = hashlib.sha1(response.content).hexdigest()
+        data = self.program_cache.revalidate(program_url, body_hash)
+        if data is not None:
+            return data
+        with span('program parse'):
+            data = self._parse_program_response(response)
+        self.program_cache.put(program_url,
+                               data,
+                               etag=response.headers.get('ETag'),
+                               last_modified=response.headers.get('Last-Modified'),
+                               body_hash=body_hash)
+        return data
+
+    @traced('program')
+    def _get_matches_both_menu_response(self, program_url, headers=None):
+        """Get respond with all matches of one day"""
+        self.relogin_if_needed()
+        response = self.session.get(program_url, headers=headers)
+        if self._is_unauthenticated(response):
+            self._relogin()
+            response = self.session.get(program_url, headers=headers)
+        return response
+
+    @staticmethod
+    def _parse_program_response(response):
         response.encoding = 'utf-8'
-        if 'program' not in response.text:
+        try:
+            data = json.loads(response.text)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or 'program' not in data:
             log(response.text)
             raise Exceptions.UnableGetStreamListException()
-        return response
+        return data
 
+    @traced('alert check')
     def _check_alert_message_and_throw_exception(self):
         """
         Return any alert message from Tipsport (like bet request)
         Return None if everything is OK
         """
         page = self.session.get(self.user_data.site_mobile + '/rest/articles/v1/tv/info')
+        if self._is_unauthenticated(page):
+            raise Exceptions.SessionExpiredException()
         name = 'buttonDescription'
         try:
             data = json.loads(page.text)
@@ -197,18 +490,3 @@ class Tipsport:
             log('Unable to get Tipsport alert message')
             raise Exceptions.UnableGetStreamMetadataException()
 
-
-def get_stream_number(relative_url):
-    """
-    Get stream number from relative URL
-    Example:
-        /tenis-marterer-maximilian-petrovic-danilo/2768186 -> 2768186
-    """
-    base_url = relative_url.split('#')[0]
-    tokens = base_url.split('/')
-    number = tokens[-1]
-    try:
-        int(number)
-    except ValueError:
-        raise Exceptions.UnableGetStreamNumberException()
-    return number
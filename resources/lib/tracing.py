@@ -0,0 +1,199 @@
+# coding=utf-8
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from os import path, makedirs
+
+TRACE_FILENAME = 'trace.log'
+MAX_TRACE_FILE_SIZE = 512 * 1024  # bytes, older traces are kept in one rotated file
+
+_trace = None
+
+
+class Span:
+    """Timed part of one plugin invocation together with HTTP requests sent inside it"""
+    def __init__(self, name, parent, origin):
+        self.name = name
+        self.parent = parent
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter() - origin
+        self.duration = None
+        self.error = None
+        self.responses = []
+
+    def finish(self, origin, error=None):
+        self.duration = time.perf_counter() - origin - self.start
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self, parent_index):
+        result = {
+            'name': self.name,
+            'parent': parent_index,
+            'start_ms': round(self.start * 1000, 1),
+            'ms': round(self.duration * 1000, 1) if self.duration is not None else None
+        }
+        if self.responses:
+            result['status'] = [response.status_code for response in self.responses]
+            result['bytes_out'] = sum(_get_request_size(response.request) for response in self.responses)
+            result['bytes_in'] = sum(_get_response_size(response) for response in self.responses)
+        if self.error:
+            result['error'] = self.error
+        if self.thread != 'MainThread':
+            result['thread'] = self.thread
+        return result
+
+
+class Trace:
+    """
+    Spans of one plugin invocation
+
+    Spans nest per thread, spans started in worker threads (e.g. concurrent stream probes)
+    are children of the root span. Requests sent outside of any span belong to the root span.
+    """
+    def __init__(self, name):
+        self.time = time.time()
+        self.origin = time.perf_counter()
+        self.root = Span(name, None, self.origin)
+        self.spans = [self.root]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        stack = self._get_stack()
+        return stack[-1] if stack else self.root
+
+    def start_span(self, name):
+        span = Span(name, self.current(), self.origin)
+        with self._lock:
+            self.spans.append(span)
+        self._get_stack().append(span)
+        return span
+
+    def finish_span(self, span, error=None):
+        span.finish(self.origin, error)
+        stack = self._get_stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+        indexes = {id(span): index for index, span in enumerate(spans)}
+        return {
+            'name': self.root.name,
+            'time': round(self.time, 3),
+            'ms': round(self.root.duration * 1000, 1) if self.root.duration is not None else None,
+            'spans': [span.to_dict(indexes.get(id(span.parent))) for span in spans]
+        }
+
+
+def start_trace(name):
+    """Start recording spans of this invocation (spans are ignored until a trace is started)"""
+    global _trace
+    _trace = Trace(name)
+    return _trace
+
+
+def finish_trace(directory=None):
+    """
+    Stop recording and return trace as dict (None if no trace was started)
+    Trace is appended as one JSON line to the rolling trace file in directory if given (see save_trace)
+    """
+    global _trace
+    trace, _trace = _trace, None
+    if trace is None:
+        return None
+    trace.root.finish(trace.origin)
+    result = trace.to_dict()
+    if directory is not None:
+        save_trace(directory, result)
+    return result
+
+
+@contextmanager
+def span(name):
+    """
+    Time block of code as a span of current trace
+
+    Example:
+        with span('login'):
+            tipsport.login()
+    """
+    trace = _trace
+    if trace is None:
+        yield
+        return
+    current = trace.start_span(name)
+    try:
+        yield
+    except BaseException as e:
+        trace.finish_span(current, e)
+        raise
+    trace.finish_span(current)
+
+
+def traced(name):
+    """Decorator timing every call of function as a span"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _trace is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_response(response, *args, **kwargs):
+    """Response hook of requests session, assign response to the current span of this thread"""
+    trace = _trace
+    if trace is not None:
+        trace.current().responses.append(response)
+    return response
+
+
+def save_trace(directory, trace):
+    """Append trace to the trace file in directory (OSError is raised if it cannot be written)"""
+    trace_path = path.join(directory, TRACE_FILENAME)
+    makedirs(directory, exist_ok=True)
+    if path.exists(trace_path) and path.getsize(trace_path) > MAX_TRACE_FILE_SIZE:
+        os.replace(trace_path, trace_path + '.1')
+    with open(trace_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(trace, separators=(',', ':')) + '\n')
+
+
+def _get_request_size(request):
+    body = getattr(request, 'body', None)
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    try:
+        return len(body)
+    except TypeError:  # streamed body
+        return 0
+
+
+def _get_response_size(response):
+    """Size of response body as sent by server (without reading streamed body)"""
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        pass
+    try:
+        return response.raw.tell()
+    except Exception:
+        return 0
@@ -1,10 +1,6 @@
 # coding=utf-8
 import os
 from os import path
-import platform
-import shutil
-import requests
-import zipfile
 from . import tipsport_exceptions as Exceptions
 from xbmc import log as log_fce
 
@@ -15,7 +11,39 @@ def log(message):
     log_fce('|plugin.video.tipsport.elh|\t{0}'.format(message))
 
 
+def log_exception():
+    """Log traceback of exception being handled"""
+    import traceback
+    log(traceback.format_exc())
+
+
+def get_connection_exceptions():
+    """
+    Exceptions meaning there is no (stable) connection, to be used in except clause
+    Except clause is evaluated only when an exception is raised, so requests is not imported before it is needed
+    """
+    from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError
+    return Exceptions.NoInternetConnectionsException, ConnectionError, Timeout, ChunkedEncodingError
+
+
+def get_stream_number(relative_url):
+    """
+    Get stream number from relative URL
+    Example:
+        /tenis-marterer-maximilian-petrovic-danilo/2768186 -> 2768186
+    """
+    base_url = relative_url.split('#')[0]
+    tokens = base_url.split('/')
+    number = tokens[-1]
+    try:
+        int(number)
+    except ValueError:
+        raise Exceptions.UnableGetStreamNumberException()
+    return number
+
+
 def get_host_info():
+    import platform
     try:
         return {
             'Host': {
@@ -37,6 +65,8 @@ def get_host_info():
 
 
 def update_code_from_git(kodi_helper):
+    import shutil
+    import zipfile
     try:
         tmp_file = path.join(kodi_helper.tmp_path, 'new_version.zip')
         download_file(GITHUB_CODE_URL + 'archive/refs/heads/master.zip', tmp_file)
@@ -58,7 +88,9 @@ def update_code_from_git(kodi_helper):
 
 
 def download_file(url, path):
-    with requests.get(url, stream=True) as r:
+    import shutil
+    from .http_client import create_session
+    with create_session().get(url, stream=True) as r:
         r.raise_for_status()
         with open(path, 'wb') as f:
             shutil.copyfileobj(r.raw, f)
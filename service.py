@@ -0,0 +1,103 @@
+import xbmc
+import time
+import traceback
+from resources.lib.tipsport_stream_generator import Tipsport
+import resources.lib.tipsport_exceptions as Exceptions
+from resources.lib.kodi_helper import KodiHelper, TIPSPORT_STORAGE_KEY
+from resources.lib.match_catalog import COMPETITIONS
+from resources.lib.icon_pipeline import IconPipeline
+from resources.lib.mem_storage import MemStorage, JsonCodec
+from resources.lib.utils import log
+
+REFRESH_INTERVAL = 60  # seconds
+LOGIN_RETRY_INTERVAL = 5 * 60  # seconds, doubled after every failed login
+MAX_LOGIN_RETRY_INTERVAL = 4 * 60 * 60  # seconds
+
+
+class TipsportService(xbmc.Monitor):
+    """
+    Background service keeping Tipsport session warm
+
+    Periodically refresh list of matches and resolve streams of matches which are about to start
+    (or running and not finished) so the plugin only reads them from Tipsport snapshot in MemStorage.
+    Login descriptor is downloaded here as well, so logins in the plugin do not wait for the login provider,
+    and missing match icons are generated, so listings show them right away.
+    After a failed login (e.g. wrong password) refreshes pause for LOGIN_RETRY_INTERVAL, doubled with every
+    further failure, so Tipsport is not asked to log in every REFRESH_INTERVAL. Change of settings ends the pause.
+    """
+    def __init__(self):
+        super(TipsportService, self).__init__()
+        self._login_failures = 0
+        self._paused_until = 0
+
+    def onSettingsChanged(self):
+        self._login_failures = 0
+        self._paused_until = 0
+
+    def run(self):
+        log('Service started')
+        while not self.abortRequested():
+            try:
+                if time.time() >= self._paused_until:
+                    self.refresh()
+                    self._login_failures = 0
+            except Exceptions.LoginFailedException:
+                self._pause_after_failed_login()
+            except Exception:
+                log(traceback.format_exc())
+            if self.waitForAbort(REFRESH_INTERVAL):
+                break
+        log('Service stopped')
+
+    def refresh(self):
+        kodi_helper = KodiHelper()
+        if not kodi_helper.background_service:
+            return
+        storage = MemStorage(kodi_helper.storage_id, codec=JsonCodec)
+        loaded_state = storage.get(TIPSPORT_STORAGE_KEY)
+        tipsport = Tipsport.from_state(kodi_helper, loaded_state) or Tipsport(kodi_helper)
+        tipsport.refresh_login_descriptor()
+        tipsport.relogin_if_needed()
+        catalog = tipsport.get_match_catalog()
+        for league in COMPETITIONS:
+            for match in catalog.get_league_matches(league):
+                if self.abortRequested():
+                    return
+                if match.is_about_to_start() or match.is_live():
+                    self._prefetch_stream(tipsport, match)
+        self._save(storage, tipsport, loaded_state)
+        if kodi_helper.can_generate_logos:
+            IconPipeline(kodi_helper).start(catalog.get_matches())
+
+    def _pause_after_failed_login(self):
+        interval = min(LOGIN_RETRY_INTERVAL * 2 ** self._login_failures, MAX_LOGIN_RETRY_INTERVAL)
+        self._login_failures += 1
+        self._paused_until = time.time() + interval
+        log('Login failed, service paused for {0} s'.format(interval))
+
+    @staticmethod
+    def _save(storage, tipsport, loaded_state):
+        """
+        Save Tipsport snapshot
+        If a plugin invocation has saved its snapshot since the refresh started, that one is kept
+        and just streams resolved here are merged into it
+        """
+        state = storage.get(TIPSPORT_STORAGE_KEY)
+        if state is not None and state != loaded_state:
+            storage[TIPSPORT_STORAGE_KEY] = tipsport.merge_into_state(state)
+        else:
+            storage[TIPSPORT_STORAGE_KEY] = tipsport.get_state()
+
+    @staticmethod
+    def _prefetch_stream(tipsport, match):
+        """Resolve stream into Tipsport stream cache (nothing is requested if it is cached already)"""
+        try:
+            tipsport.get_stream(match.url, match.competition)
+        except Exceptions.LoginFailedException:
+            raise
+        except Exceptions.TpgException as e:
+            log('Unable to prefetch stream ({0}): {1}'.format(match.name, e))
+
+
+if __name__ == '__main__':
+    TipsportService().run()
@@ -15,21 +15,11 @@ def test_login(tipsport) -> bool:
         return False
 
 
-def test_all_streams(tipsport) -> None:
-    tipsport.login()
-    matches = tipsport.get_list_matches(None)
-    for match in matches:
-        try:
-            if match.is_stream_enabled():
-                tipsport.get_stream(match.url).get_link()
-        except:
-            pass
-
-
 def _get_tipsport(username, password) -> Tipsport:
     return Tipsport(UserData(username, password, 'tipsport.cz'), None)
 
 
 if __name__ == '__main__':
+    # Streams of all matches are checked by: python -m benchmarks.check_streams
     tipsport = _get_tipsport(input('username: '), input('password: '))
-    test_all_streams(tipsport)
+    print(test_login(tipsport))
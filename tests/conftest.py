@@ -0,0 +1,26 @@
+"""
+Stand-ins of Kodi modules, so modules of the addon can be imported outside Kodi
+
+Tests which need more of Kodi (e.g. xbmcgui.Window) patch sys.modules themselves.
+"""
+import os
+import sys
+
+
+class xbmc:
+    @staticmethod
+    def log(message, level=0):
+        pass
+
+
+class xbmcvfs:
+    @staticmethod
+    def listdir(path):
+        entries = sorted(os.listdir(path))
+        return ([entry for entry in entries if os.path.isdir(os.path.join(path, entry))],
+                [entry for entry in entries if not os.path.isdir(os.path.join(path, entry))])
+
+
+sys.modules.setdefault('xbmc', xbmc)
+sys.modules.setdefault('xbmcvfs', xbmcvfs)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
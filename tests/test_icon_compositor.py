@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+from importlib.util import find_spec
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from resources.lib import icon_compositor as ic
+
+LOGOS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources', 'media', 'LOGOS')
+VS = os.path.join(LOGOS_PATH, 'vs.png')
+PLZEN = os.path.join(LOGOS_PATH, 'CZ_TIPSPORT', 'plzen.png')
+KLADNO = os.path.join(LOGOS_PATH, 'CZ_CHANCE', 'kladno.png')
+KOSICE = os.path.join(LOGOS_PATH, 'SK_TIPSPORT', 'kosice.png')
+
+
+def paste_icon(overlay_path, first_path, second_path):
+    """Icon composed by pasting images onto transparent canvas (how icons were always generated)"""
+    from PIL import Image
+    images = [Image.open(image_path) for image_path in [overlay_path, first_path, second_path]]
+    icon = Image.new('RGB', (images[0].width, images[0].height))
+    icon.putalpha(0)
+    icon.paste(images[1], (0, 0), images[1])
+    icon.paste(images[2], (int(images[0].width / 2), 0), images[2])
+    icon.paste(images[0], (0, 0), images[0])
+    return icon
+
+
+@unittest.skipUnless(find_spec('PIL'), 'PIL is not installed')
+class TestIconCompositor(unittest.TestCase):
+    def test_pil(self):
+        icon = ic.IconCompositor(use_numpy=False).compose(VS, PLZEN, KLADNO)
+        self.assertEqual(icon.tobytes(), paste_icon(VS, PLZEN, KLADNO).tobytes())
+
+    @unittest.skipUnless(find_spec('numpy'), 'NumPy is not installed')
+    def test_numpy(self):
+        compositor = ic.IconCompositor(use_numpy=True)
+        for first, second in [(PLZEN, KLADNO), (KLADNO, PLZEN)]:
+            icon = compositor.compose(VS, first, second)
+            self.assertEqual(icon.mode, 'RGBA')
+            self.assertEqual(icon.tobytes(), paste_icon(VS, first, second).tobytes())
+
+    def test_cache_bounded(self):
+        compositor = ic.IconCompositor(cache_size=2, use_numpy=False)
+        compositor.compose(VS, PLZEN, KLADNO)
+        compositor.compose(VS, KOSICE, KLADNO)
+        self.assertEqual(len(compositor._cache), 2)
+        self.assertIn(('pil', KLADNO, 500, 500), compositor._cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
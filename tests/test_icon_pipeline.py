@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+import threading
+import importlib
+from types import SimpleNamespace
+from unittest import mock
+from resources.lib import icon_pipeline as ip
+
+
+class FakeKodiHelper:
+    """Generates icons as empty files, logo names are team names"""
+    def __init__(self, tmp_path, delay=0):
+        self.tmp_path = tmp_path
+        self.addon_data_path = tmp_path
+        self.generated = []
+        self._delay = delay
+        self._ready_icons = set(os.listdir(tmp_path))
+        self._lock = threading.Lock()
+
+    def get_match_logos(self, name_1, name_2, is_competition_with_logo):
+        return (name_1, name_2) if is_competition_with_logo else None
+
+    def get_ready_icons(self):
+        return self._ready_icons
+
+    def get_tmp_path(self, name):
+        return os.path.join(self.tmp_path, name)
+
+    def generate_icon(self, name_1, name_2, path):
+        time.sleep(self._delay)
+        open(path, 'w').close()
+        with self._lock:
+            self.generated.append((name_1, name_2))
+        return True
+
+
+def create_match(first_team, second_team, is_competition_with_logo=True):
+    return SimpleNamespace(first_team=first_team, second_team=second_team,
+                           is_competition_with_logo=is_competition_with_logo)
+
+
+class TestIconPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        open(os.path.join(self.tmp_path, '_plzen_VS_kladno.png'), 'w').close()
+        self.kodi_helper = FakeKodiHelper(self.tmp_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_generates_only_missing_icons(self):
+        matches = [create_match('plzen', 'kladno'), create_match('kladno', 'plzen'),
+                   create_match('kladno', 'plzen'), create_match('sparta', 'slavia', False)]
+        pipeline = ip.IconPipeline(self.kodi_helper)
+        self.assertEqual(pipeline.start(matches), 1)
+        self.assertEqual(pipeline.wait(), 1)
+        self.assertEqual(self.kodi_helper.generated, [('kladno', 'plzen')])
+        self.assertIn('_kladno_VS_plzen.png', self.kodi_helper.get_ready_icons())
+        self.assertEqual(ip.IconPipeline(self.kodi_helper).start(matches), 0)
+
+    def test_one_generator_at_a_time(self):
+        matches = [create_match('kladno', 'plzen'), create_match('sparta', 'slavia')]
+        kodi_helper = FakeKodiHelper(self.tmp_path, delay=0.1)
+        pipeline = ip.IconPipeline(kodi_helper)
+        self.assertEqual(pipeline.start(matches), 2)
+        self.assertEqual(ip.IconPipeline(FakeKodiHelper(self.tmp_path)).start(matches), 0)
+        self.assertEqual(pipeline.wait(), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_path, ip.ICONS_LOCK_FILENAME)))
+
+    def test_time_limit(self):
+        matches = [create_match('kladno', 'plzen'), create_match('sparta', 'slavia'), create_match('zlin', 'brno')]
+        pipeline = ip.IconPipeline(FakeKodiHelper(self.tmp_path, delay=0.1), workers=1, time_limit=0.05)
+        pipeline.start(matches)
+        self.assertEqual(pipeline.wait(), 1)
+
+
+class FakeCompositor:
+    def __init__(self, fail):
+        self.fail = fail
+
+    def save(self, overlay_path, first_path, second_path, path):
+        with open(path, 'w') as f:
+            f.write('png')
+        if self.fail:
+            raise OSError('disk full')
+
+
+class TestGenerateIcon(unittest.TestCase):
+    """KodiHelper.generate_icon writes under temporary name and renames"""
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.icon_path = os.path.join(self.tmp_path, '_kladno_VS_plzen.png')
+        modules = mock.patch.dict(sys.modules, {'xbmcaddon': SimpleNamespace(), 'xbmcvfs': SimpleNamespace()})
+        modules.start()
+        self.addCleanup(modules.stop)
+        sys.modules.pop('resources.lib.kodi_helper', None)
+        kodi_helper_module = importlib.import_module('resources.lib.kodi_helper')
+        self.kodi_helper = kodi_helper_module.KodiHelper.__new__(kodi_helper_module.KodiHelper)
+        self.kodi_helper.get_logo = lambda name: name
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def _generate(self, fail):
+        with mock.patch('resources.lib.icon_compositor.get_compositor', return_value=FakeCompositor(fail)):
+            return self.kodi_helper.generate_icon('kladno', 'plzen', self.icon_path)
+
+    def test_saved(self):
+        self.assertTrue(self._generate(fail=False))
+        self.assertEqual(os.listdir(self.tmp_path), ['_kladno_VS_plzen.png'])
+
+    def test_failure_leaves_nothing(self):
+        self.assertFalse(self._generate(fail=True))
+        self.assertEqual(os.listdir(self.tmp_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
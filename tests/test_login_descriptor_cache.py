@@ -0,0 +1,54 @@
+import unittest
+import shutil
+import tempfile
+import time
+from resources.lib import login_descriptor_cache as ldc
+
+DESCRIPTOR = {
+    'version': 1,
+    'url': 'https://www.tipsport.cz/rest/client/v1/session',
+    'post_data': '{"username": "#USERNAME#", "password": "#PASSWORD#"}',
+    'username_keyword': '#USERNAME#',
+    'password_keyword': '#PASSWORD#',
+    'headers': {}
+}
+
+
+class TestLoginDescriptorCache(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_path)
+
+    def test_stored_between_instances(self):
+        ldc.LoginDescriptorCache(self.data_path, '1.0').put(DESCRIPTOR)
+        cache = ldc.LoginDescriptorCache(self.data_path, '1.0')
+        self.assertEqual(cache.get(), DESCRIPTOR)
+        self.assertFalse(cache.needs_refresh())
+
+    def test_other_addon_version(self):
+        ldc.LoginDescriptorCache(self.data_path, '1.0').put(DESCRIPTOR)
+        cache = ldc.LoginDescriptorCache(self.data_path, '1.1')
+        self.assertIsNone(cache.get())
+        self.assertTrue(cache.needs_refresh())
+
+    def test_old_descriptor(self):
+        cache = ldc.LoginDescriptorCache(self.data_path, '1.0')
+        cache.put(DESCRIPTOR)
+        cache._entry['time'] = time.time() - ldc.REFRESH_AGE - 1
+        self.assertEqual(cache.get(), DESCRIPTOR)
+        self.assertTrue(cache.needs_refresh())
+        cache._entry['time'] = time.time() - 30 * 24 * 60 * 60
+        self.assertEqual(cache.get(), DESCRIPTOR)
+
+    def test_invalidate(self):
+        cache = ldc.LoginDescriptorCache(self.data_path, '1.0')
+        cache.put(DESCRIPTOR)
+        cache.invalidate()
+        self.assertIsNone(cache.get())
+        self.assertIsNone(ldc.LoginDescriptorCache(self.data_path, '1.0').get())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import shutil
+import tempfile
+from resources.lib import logo_index as li
+
+
+class TestLogoIndex(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.logo_path = os.path.join(self.data_path, 'LOGOS')
+        for logo in ['vs.png', 'CZ_TIPSPORT/kladno.png', 'CZ_TIPSPORT/plzen.png', 'OLD/kladno.png']:
+            self._create(logo)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_path)
+
+    def _create(self, logo):
+        logo_path = os.path.join(self.logo_path, logo)
+        os.makedirs(os.path.dirname(logo_path), exist_ok=True)
+        open(logo_path, 'w').close()
+
+    def _index(self, version='1.0'):
+        return li.LogoIndex(self.logo_path, self.data_path, version)
+
+    def test_lookup(self):
+        index = self._index()
+        self.assertEqual(index.get('vs.png'), os.path.join(self.logo_path, 'vs.png'))
+        self.assertEqual(index.get('kladno.png'), os.path.join(self.logo_path, 'CZ_TIPSPORT', 'kladno.png'))
+        self.assertIsNone(index.get('sparta_praha.png'))
+        self.assertEqual(len(index.find('kladno.*')), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.data_path, li.LOGO_INDEX_FILENAME)))
+
+    def test_stored_index_used(self):
+        self._index().get('vs.png')
+        index = self._index()
+        index._build = None  # stored manifest must be enough
+        self.assertEqual(index.get('plzen.png'), os.path.join(self.logo_path, 'CZ_TIPSPORT', 'plzen.png'))
+
+    def test_invalidated_by_directory_change(self):
+        self._index().get('vs.png')
+        self._create('SK_TIPSPORT/kosice.png')
+        os.utime(self.logo_path, (0, 0))
+        self.assertEqual(self._index().get('kosice.png'), os.path.join(self.logo_path, 'SK_TIPSPORT', 'kosice.png'))
+
+    def test_invalidated_by_addon_version(self):
+        self._index().get('vs.png')
+        self.assertIsNotNone(self._index('1.0')._load())
+        self.assertIsNone(self._index('1.1')._load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from resources.lib.match_catalog import MatchCatalog
+
+
+def _match(name, competition, sport, start_time):
+    return {
+        'name': name,
+        'competition': competition,
+        'sport': sport,
+        'url': '/{0}/1'.format(name),
+        'matchStartTime': start_time,
+        'score': {
+            'statusOffer': '',
+            'scoreOffer': ''
+        },
+        'live': False
+    }
+
+
+PROGRAM = {
+    'program': [{
+        'id': 23,
+        'matchesByTimespans': [[
+            _match('Kladno-Sparta', u'Tipsport extraliga', 'Hokej', '18:30'),
+            _match('Zlín-Třinec', u'Česká Tipsport extraliga', 'Hokej', '17:00'),
+            _match('Poprad-Nitra', u'Tipsport Liga', 'Hokej', '17:30')
+        ], [_match('Kanada-USA', u'MS', 'Hokej', '20:00')]]
+    }, {
+        'id': 1,
+        'matchesByTimespans': [[_match('Slavia-Baník', u'Tipsport extraliga', 'Fotbal', '16:00')]]
+    }]
+}
+
+
+class TestMatchCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = MatchCatalog.from_program(PROGRAM)
+
+    def test_all_matches_sorted(self):
+        times = [match.start_time for match in self.catalog.get_matches()]
+        self.assertEqual(times, ['16:00', '17:00', '17:30', '18:30', '20:00'])
+
+    def test_league_matches_only_ice_hockey(self):
+        matches = self.catalog.get_league_matches('CZ_TIPSPORT')
+        self.assertEqual([match.name for match in matches], ['Zlín - Třinec', 'Kladno - Sparta'])
+        self.assertTrue(all(match.icon_name == 'cz_tipsport_logo.png' for match in matches))
+        self.assertEqual(self.catalog.get_league_matches('CZ_CHANCE'), [])
+        self.assertTrue(all(match.icon_name is None for match in self.catalog.get_matches()))
+
+    def test_folders(self):
+        self.assertEqual(set(self.catalog.get_sports()), {'Hokej', 'Fotbal'})
+        self.assertEqual(set(self.catalog.get_competitions('Hokej')),
+                         {u'Tipsport extraliga', u'Česká Tipsport extraliga', u'Tipsport Liga', u'MS'})
+        self.assertEqual(self.catalog._matches, {})  # folder levels do not create matches
+        self.assertEqual([match.name for match in self.catalog.get_matches('Hokej', u'MS')], ['Kanada - USA'])
+        self.assertEqual(self.catalog.get_matches('Tenis', u'MS'), [])
+
+    def test_more_days(self):
+        tomorrow = date.today() + timedelta(days=1)
+        today_entries = MatchCatalog.create_entries(PROGRAM)
+        tomorrow_entries = MatchCatalog.create_entries(
+            {'program': [{
+                'id': 23,
+                'matchesByTimespans': [[_match('Plzeň-Olomouc', u'Tipsport extraliga', 'Hokej', '10:00')]]
+            }]}, tomorrow)
+        catalog = MatchCatalog.from_days([today_entries, tomorrow_entries, tomorrow_entries])
+        matches = catalog.get_league_matches('CZ_TIPSPORT')
+        self.assertEqual([match.name for match in matches], ['Zlín - Třinec', 'Kladno - Sparta', 'Plzeň - Olomouc'])
+        self.assertEqual(matches[-1].match_time.date(), tomorrow)
+        self.assertEqual(matches[-1].get_start_time_label(), '{0}. {1}. 10:00'.format(tomorrow.day, tomorrow.month))
+        self.assertFalse(matches[-1].is_stream_enabled())
+
+    def test_prefetch_window(self):
+        def match(minutes_to_start, live=False):
+            start = datetime.now() + timedelta(minutes=minutes_to_start)
+            data = dict(_match('Kladno-Sparta', u'Tipsport extraliga', 'Hokej', start.strftime('%H:%M')), live=live)
+            return MatchCatalog._create_match(data, 'CZ_TIPSPORT', start.date())
+
+        self.assertTrue(match(10).is_about_to_start())
+        self.assertFalse(match(30).is_about_to_start())
+        self.assertFalse(match(-60).is_about_to_start())
+        self.assertTrue(match(-60, True).is_live())
+        self.assertFalse(match(-60).is_live())
+        self.assertFalse(match(-5 * 60, True).is_live())
+        self.assertFalse(match(10, True).is_live())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+import unittest
+import importlib
+import sys
+import os
+from unittest import mock
+
+
+class xbmcgui:
+    class Window:
+        properties = {}
+        reads = 0
+
+        def __init__(self, window_id):
+            pass
+
+        def getProperty(self, key):
+            xbmcgui.Window.reads += 1
+            return self.properties.get(key, '')
+
+        def setProperty(self, key, value):
+            self.properties[key] = value
+
+        def clearProperty(self, key):
+            self.properties.pop(key, None)
+
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources', 'lib'))
+
+
+class TestMemStorage(unittest.TestCase):
+    def setUp(self):
+        self.modules = mock.patch.dict(sys.modules, {'xbmcgui': xbmcgui})
+        self.modules.start()
+        sys.modules.pop('mem_storage', None)
+        self.ms = importlib.import_module('mem_storage')
+        xbmcgui.Window.properties.clear()
+        self.storage = self.ms.MemStorage('test')
+
+    def tearDown(self):
+        self.modules.stop()
+
+    def test_set_and_get(self):
+        self.storage['a'] = {'b': [1, 2]}
+        self.assertEqual(self.storage['a'], {'b': [1, 2]})
+        self.assertIn('a', self.storage)
+        self.assertRaises(KeyError, lambda: self.storage['missing'])
+
+    def test_overwrite_does_not_duplicate_key(self):
+        self.storage['a'] = 1
+        self.storage['a'] = 2
+        self.assertEqual(list(self.storage), ['a'])
+        self.assertEqual(len(self.storage), 1)
+
+    def test_delete(self):
+        self.storage['a'] = 1
+        self.storage['b'] = 2
+        del self.storage['a']
+        self.assertEqual(set(self.storage), {'b'})
+        with self.assertRaises(KeyError):
+            del self.storage['a']
+
+    def test_shared_between_instances(self):
+        self.storage['a'] = 1
+        self.assertEqual(self.ms.MemStorage('test')['a'], 1)
+        self.assertNotIn('a', self.ms.MemStorage('other'))
+
+    def test_bulk(self):
+        self.storage['a'] = 0
+        self.storage.set_many({'a': 1, 'b': 'x'})
+        xbmcgui.Window.reads = 0
+        self.assertEqual(self.storage.get_many(['a', 'b']), {'a': 1, 'b': 'x'})
+        self.assertEqual(xbmcgui.Window.reads, 1)
+        self.assertEqual(self.storage['a'], 1)
+        self.assertEqual(set(self.storage), {'a', 'b'})
+
+    def test_bulk_and_single_items(self):
+        self.storage.set_many({'a': 1, 'b': 2})
+        self.storage['a'] = 3
+        self.storage['c'] = 4
+        del self.storage['b']
+        self.assertEqual(self.storage.get_many(['a', 'b', 'c']), {'a': 3, 'c': 4})
+        self.assertEqual(set(self.storage), {'a', 'c'})
+
+    def test_index_of_previous_version_is_reset(self):
+        xbmcgui.Window.properties['test____keys__'] = "(lp0\nVa\np1\na."
+        self.assertNotIn('a', self.storage)
+        self.assertEqual(len(self.storage), 0)
+        self.assertNotIn('test____keys__', xbmcgui.Window.properties)
+        self.storage['a'] = 1
+        self.assertEqual(list(self.storage), ['a'])
+
+    def test_json_codec(self):
+        storage = self.ms.MemStorage('json', codec=self.ms.JsonCodec)
+        storage['a'] = {'b': [1, 2]}
+        self.assertEqual(storage['a'], {'b': [1, 2]})
+
+    def test_value_is_text(self):
+        self.storage['a'] = b'\x00\xff'
+        self.assertTrue(all(isinstance(v, str) for v in xbmcgui.Window.properties.values()))
+        self.assertEqual(self.storage['a'], b'\x00\xff')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
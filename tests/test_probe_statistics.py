@@ -0,0 +1,57 @@
+import unittest
+import shutil
+import tempfile
+import time
+from resources.lib import probe_statistics as ps
+
+FORMATS = ['HLS', 'RTMP', 'RTMP_WITH_HLS', 'OTHER']
+
+
+class TestProbeStatistics(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_path)
+
+    def test_default_order(self):
+        statistics = ps.ProbeStatistics(self.data_path)
+        self.assertEqual(statistics.order(FORMATS, 'LIVEBOX_ELH', 'Tipsport extraliga'), FORMATS)
+        self.assertIsNone(statistics.get_source('Tipsport extraliga'))
+
+    def test_successful_format_first(self):
+        statistics = ps.ProbeStatistics(self.data_path)
+        statistics.record('LIVEBOX_ELH', 'Tipsport extraliga', [('HLS', False), ('RTMP', True)])
+        statistics = ps.ProbeStatistics(self.data_path)
+        self.assertEqual(statistics.order(FORMATS, 'LIVEBOX_ELH', 'Tipsport extraliga'),
+                         ['RTMP', 'RTMP_WITH_HLS', 'OTHER', 'HLS'])
+        self.assertTrue(statistics.is_proven('RTMP', 'LIVEBOX_ELH', 'Tipsport extraliga'))
+        self.assertFalse(statistics.is_proven('HLS', 'LIVEBOX_ELH', 'Tipsport extraliga'))
+        self.assertEqual(statistics.get_source('Tipsport extraliga'), 'LIVEBOX_ELH')
+        self.assertEqual(statistics.order(FORMATS, 'HUSTE', 'Tipsport extraliga'), FORMATS)
+
+    def test_failing_format_skipped_and_explored_again(self):
+        statistics = ps.ProbeStatistics(self.data_path)
+        for _ in range(ps.SKIP_AFTER_FAILURES):
+            statistics.record('HUSTE', 'Tipos extraliga', [('HLS', True), ('OTHER', False)])
+        self.assertEqual(statistics.order(FORMATS, 'HUSTE', 'Tipos extraliga'), ['HLS', 'RTMP', 'RTMP_WITH_HLS'])
+        key_stats = statistics.get_state()['keys']['HUSTE|Tipos extraliga']
+        key_stats['formats']['OTHER']['last_failure'] = time.time() - ps.EXPLORATION_INTERVAL - 1
+        self.assertIn('OTHER', statistics.order(FORMATS, 'HUSTE', 'Tipos extraliga'))
+
+    def test_successes_keep_priority(self):
+        statistics = ps.ProbeStatistics(self.data_path)
+        statistics.record('LIVEBOX_ELH', 'Tipsport extraliga', [('HLS', True)])
+        statistics.record('LIVEBOX_ELH', 'Tipsport extraliga', [('OTHER', True), ('RTMP_WITH_HLS', True)])
+        self.assertEqual(statistics.order(FORMATS, 'LIVEBOX_ELH', 'Tipsport extraliga'), FORMATS)
+
+    def test_restored_from_state(self):
+        statistics = ps.ProbeStatistics(self.data_path)
+        statistics.record('MANUAL', None, [('HLS', False), ('RTMP', False), ('RTMP_WITH_HLS', True)])
+        restored = ps.ProbeStatistics(tempfile.gettempdir(), state=statistics.get_state())
+        self.assertEqual(restored.order(FORMATS, 'MANUAL', None)[0], 'RTMP_WITH_HLS')
+        self.assertTrue(restored.is_proven('RTMP_WITH_HLS', 'MANUAL', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from resources.lib import process_lock as pl
+
+
+class TestProcessLock(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.lock_path = os.path.join(self.data_path, 'test.lock')
+
+    def tearDown(self):
+        shutil.rmtree(self.data_path)
+
+    def test_exclusive(self):
+        with pl.FileLock(self.lock_path) as lock:
+            self.assertTrue(lock.locked)
+            self.assertFalse(lock.waited)
+            other = pl.FileLock(self.lock_path)
+            self.assertFalse(other.acquire(timeout=0.1))
+            self.assertTrue(other.waited)
+        self.assertFalse(os.path.exists(self.lock_path))
+        self.assertTrue(other.acquire(timeout=0))
+        other.release()
+
+    def test_stale_lock_removed(self):
+        self._create_stale_lock()
+        lock = pl.FileLock(self.lock_path)
+        self.assertTrue(lock.acquire(timeout=1))
+        lock.release()
+
+    def test_fresh_lock_replacing_stale_one_is_kept(self):
+        self._create_stale_lock()
+        rename = os.rename
+
+        def replace_then_rename(source, destination):
+            os.remove(self.lock_path)  # other process removes the stale lock and locks
+            self.assertTrue(pl.FileLock(self.lock_path).acquire(timeout=0))
+            rename(source, destination)
+
+        lock = pl.FileLock(self.lock_path)
+        with mock.patch.object(pl.os, 'rename', replace_then_rename):
+            self.assertFalse(lock.acquire(timeout=0))
+        self.assertTrue(os.path.exists(self.lock_path))
+        self.assertEqual(os.listdir(self.data_path), ['test.lock'])
+
+    def test_release_keeps_lock_of_other_process(self):
+        lock = pl.FileLock(self.lock_path)
+        lock.acquire()
+        os.remove(self.lock_path)  # removed as stale, other process locks
+        other = pl.FileLock(self.lock_path)
+        self.assertTrue(other.acquire(timeout=0))
+        lock.release()
+        self.assertTrue(os.path.exists(self.lock_path))
+        other.release()
+        self.assertFalse(os.path.exists(self.lock_path))
+
+    def test_held_lock_never_stale(self):
+        with mock.patch.object(pl, 'STALE_AGE', 0.3), mock.patch.object(pl, 'HEARTBEAT_INTERVAL', 0.05):
+            with pl.FileLock(self.lock_path):
+                for _ in range(8):
+                    time.sleep(0.1)
+                    self.assertFalse(pl.FileLock(self.lock_path).acquire(timeout=0))
+            self.assertFalse(os.path.exists(self.lock_path))
+
+    def _create_stale_lock(self):
+        with open(self.lock_path, 'w') as f:
+            f.write('1')
+        old = time.time() - pl.STALE_AGE - 1
+        os.utime(self.lock_path, (old, old))
+
+    def test_coalesce(self):
+        shared = {}
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            shared['result'] = 'program'
+            return 'program'
+
+        def run():
+            results.append(pl.coalesce(self.lock_path, fetch, lambda: shared.get('result')))
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        time.sleep(0.05)
+        run()
+        leader.join()
+        self.assertEqual(results, ['program', 'program'])
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
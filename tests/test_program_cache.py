@@ -0,0 +1,92 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from resources.lib import program_cache as pc
+
+KEY = 'https://m.tipsport.cz/rest/articles/v1/tv/program?day=0&articleId='
+DATA = {'program': [{'matchesByTimespans': []}]}
+
+
+class TestProgramCache(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_path)
+
+    def _later(self, seconds):
+        return mock.patch('time.time', return_value=time.time() + seconds)
+
+    def test_fresh_until_ttl(self):
+        pc.ProgramCache(self.data_path, ttl=120).put(KEY, DATA, etag='"1"')
+        cache = pc.ProgramCache(self.data_path, ttl=120)
+        self.assertEqual(cache.get(KEY), DATA)
+        with self._later(121):
+            self.assertIsNone(cache.get(KEY))
+        self.assertIsNone(pc.ProgramCache(self.data_path, ttl=0).get(KEY))
+        self.assertEqual(os.listdir(self.data_path), [pc.PROGRAM_CACHE_FILENAME])
+
+    def test_validators_until_max_age(self):
+        cache = pc.ProgramCache(self.data_path)
+        cache.put(KEY, DATA, etag='"1"', last_modified='Sat, 17 Oct 2026 10:00:00 GMT', body_hash='a')
+        with self._later(pc.MAX_AGE - 1):
+            self.assertEqual(cache.get_validators(KEY),
+                             {'If-None-Match': '"1"', 'If-Modified-Since': 'Sat, 17 Oct 2026 10:00:00 GMT'})
+            self.assertEqual(cache.get_hash(KEY), 'a')
+        with self._later(pc.MAX_AGE + 1):
+            self.assertEqual(cache.get_validators(KEY), {})
+            self.assertIsNone(cache.get_hash(KEY))
+            self.assertIsNone(cache.revalidate(KEY))
+
+    def test_old_entries_evicted(self):
+        cache = pc.ProgramCache(self.data_path)
+        cache.put(KEY, DATA, body_hash='a')
+        with self._later(pc.MAX_AGE + 1):
+            cache.put('other', DATA)
+        cache = pc.ProgramCache(self.data_path)
+        self.assertIsNone(cache.get_hash(KEY))
+        self.assertEqual(cache.get_since('other', 0), DATA)
+
+    def test_revalidate_not_modified(self):
+        cache = pc.ProgramCache(self.data_path, ttl=120)
+        cache.put(KEY, DATA, etag='"1"')
+        with self._later(600):
+            self.assertIsNone(cache.get(KEY))
+            self.assertEqual(cache.revalidate(KEY), DATA)
+            self.assertEqual(pc.ProgramCache(self.data_path, ttl=120).get(KEY), DATA)
+            self.assertEqual(cache.get_validators(KEY), {'If-None-Match': '"1"'})
+
+    def test_revalidate_by_hash(self):
+        cache = pc.ProgramCache(self.data_path, ttl=120)
+        cache.put(KEY, DATA, body_hash='a')
+        with self._later(600):
+            self.assertIsNone(cache.revalidate(KEY, 'b'))
+            self.assertIsNone(cache.get(KEY))
+            self.assertEqual(cache.revalidate(KEY, 'a'), DATA)
+            self.assertEqual(cache.get(KEY), DATA)
+
+    def test_get_since(self):
+        cache = pc.ProgramCache(self.data_path, ttl=0)
+        since = time.time()
+        self.assertIsNone(cache.get_since(KEY, since))
+        pc.ProgramCache(self.data_path, ttl=0).put(KEY, DATA)  # other process
+        self.assertEqual(cache.get_since(KEY, since), DATA)
+        self.assertIsNone(cache.get_since(KEY, time.time() + 1))
+
+    def test_state_without_data(self):
+        cache = pc.ProgramCache(self.data_path, ttl=120)
+        cache.put(KEY, DATA, etag='"1"', body_hash='a')
+        state = cache.get_state()
+        self.assertNotIn('data', state[KEY])
+        self.assertEqual(state[KEY]['hash'], 'a')
+        restored = pc.ProgramCache(self.data_path, ttl=120, entries=state)
+        self.assertEqual(restored.get_hash(KEY), 'a')
+        self.assertEqual(restored.get(KEY), DATA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from resources.lib import session_validity as sv
+
+
+class TestSessionValidity(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_path)
+
+    def test_valid_until_expiry(self):
+        validity = sv.SessionValidity(self.data_path)
+        self.assertFalse(validity.is_valid())
+        validity.mark_valid(600)
+        self.assertTrue(sv.SessionValidity(self.data_path).is_valid())
+        with mock.patch('time.time', return_value=time.time() + 601):
+            self.assertFalse(validity.is_valid())
+        self.assertEqual(os.listdir(self.data_path), [sv.VALIDITY_FILENAME])
+
+    def test_duration_capped(self):
+        validity = sv.SessionValidity(self.data_path)
+        validity.mark_valid(10 * sv.MAX_DURATION)
+        self.assertEqual(validity.valid_until - validity.valid_since, sv.MAX_DURATION)
+
+    def test_invalidate(self):
+        validity = sv.SessionValidity(self.data_path)
+        validity.mark_valid()
+        validity.invalidate()
+        self.assertFalse(sv.SessionValidity(self.data_path).is_valid())
+
+    def test_restored_from_state(self):
+        validity = sv.SessionValidity(self.data_path)
+        validity.mark_valid()
+        restored = sv.SessionValidity(tempfile.gettempdir(), state=validity.get_state())
+        self.assertTrue(restored.is_valid())
+
+    def test_login_duration(self):
+        self.assertEqual(sv.get_login_duration(SimpleNamespace(text='{"duration": 300}')), 300)
+
+    def test_login_duration_fallback(self):
+        for text in ['', 'null', '300', '{"remainingTime": 300}', '{"duration": "300"}', '{"duration": 0}',
+                     '{"duration": 1800000}']:
+            self.assertEqual(sv.get_login_duration(SimpleNamespace(text=text)), sv.DEFAULT_DURATION, text)
+
+
+if __name__ == '__main__':
+    unittest.main()
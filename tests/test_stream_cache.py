@@ -0,0 +1,30 @@
+import unittest
+import time
+from unittest import mock
+from resources.lib import stream_cache as sc
+from resources.lib.stream import PlainStream
+
+
+class TestStreamCache(unittest.TestCase):
+    def test_expiry_from_link(self):
+        self.assertEqual(sc.get_link_expiry('https://host/index.m3u8?hdnts=exp=1700000000~acl=/*~hmac=ab'), 1700000000)
+        self.assertEqual(sc.get_link_expiry('https://host/index.m3u8?expires=1700000000000'), 1700000000)
+        self.assertIsNone(sc.get_link_expiry('https://host/index.m3u8'))
+
+    def test_replayed_stream_is_resolved_again(self):
+        cache = sc.StreamCache()
+        cache.put('1000', PlainStream('https://host/index.m3u8?expires={0}'.format(int(time.time()) + 3600)))
+        self.assertIsNotNone(cache.get_for_playback('1000'))
+        self.assertIsNone(cache.get_for_playback('1000'))
+        self.assertIsNone(cache.get('1000'))
+
+    def test_played_long_ago(self):
+        cache = sc.StreamCache()
+        cache.put('1000', PlainStream('https://host/index.m3u8?expires={0}'.format(int(time.time()) + 3600)))
+        cache.get_for_playback('1000')
+        with mock.patch('time.time', return_value=time.time() + sc.REPLAY_INTERVAL + 1):
+            self.assertIsNotNone(cache.get_for_playback('1000'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import json
+import threading
+import time
+from types import SimpleNamespace
+from resources.lib import stream_strategy_factory as ssf
+from resources.lib import stream_strategy as Strategies
+from resources.lib.tipsport_exceptions import StreamHasNotStarted
+
+RELATIVE_URL = '/kladno-sparta-praha/1000'
+USER_DATA = SimpleNamespace(site_mobile='https://m.tipsport.cz')
+
+
+class FakeSession:
+    """Answers stream info requests by format: format -> (stream type, delay in seconds), None is the started check"""
+    def __init__(self, answers):
+        self.answers = answers
+        self.formats = []
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        stream_format = url.split('&format=')[1] if '&format=' in url else None
+        with self._lock:
+            self.formats.append(stream_format)
+        stream_type, delay = self.answers.get(stream_format, ('UNKNOWN', 0))
+        time.sleep(delay)
+        text = json.dumps({'displayRules': {}, 'source': 'LIVEBOX_ELH', 'type': stream_type, 'data': 'url'})
+        return SimpleNamespace(status_code=200, text=text)
+
+
+class FakeStatistics:
+    def __init__(self):
+        self.recorded = []
+
+    def get_source(self, competition):
+        return None
+
+    def order(self, formats, source, competition):
+        return formats
+
+    def is_proven(self, stream_format, source, competition):
+        return False
+
+    def record(self, source, competition, outcomes):
+        self.recorded.append(outcomes)
+
+
+class TestStreamStrategyFactory(unittest.TestCase):
+    def _factory(self, session, concurrent_probing=True, hints=None, statistics=None):
+        return ssf.StreamStrategyFactory(session, USER_DATA, concurrent_probing=concurrent_probing, hints=hints,
+                                         statistics=statistics)
+
+    def test_priority_not_first_response(self):
+        session = FakeSession({None: ('URL_PERFORM', 0), 'HLS': ('HLS', 0.1), 'RTMP': ('RTMP', 0)})
+        strategy = self._factory(session).get_stream_strategy(RELATIVE_URL)
+        self.assertIsInstance(strategy, Strategies.HLSStreamStrategy)
+
+    def test_started_check_answers_probe(self):
+        for concurrent_probing in [True, False]:
+            session = FakeSession({None: ('HLS', 0)})
+            factory = self._factory(session, concurrent_probing, hints={'1000': 'HLS'})
+            self.assertIsInstance(factory.get_stream_strategy(RELATIVE_URL), Strategies.HLSStreamStrategy)
+            self.assertEqual(session.formats, [None])
+
+    def test_hint_goes_first(self):
+        session = FakeSession({None: ('HLS', 0), 'RTMP': ('RTMP', 0)})
+        factory = self._factory(session, hints={'1000': 'RTMP'})
+        self.assertIsInstance(factory.get_stream_strategy(RELATIVE_URL), Strategies.RTMPStreamStrategy)
+        self.assertEqual(sorted(session.formats, key=str), [None, 'RTMP'])
+        self.assertEqual(factory.get_hints(), {'1000': 'RTMP'})
+
+    def test_records_only_awaited_probes(self):
+        statistics = FakeStatistics()
+        session = FakeSession({None: ('URL_PERFORM', 0.05), 'HLS': ('HLS', 0.05), 'RTMP': ('RTMP', 0)})
+        factory = self._factory(session, statistics=statistics)
+        self.assertIsInstance(factory.get_stream_strategy(RELATIVE_URL), Strategies.HLSStreamStrategy)
+        self.assertEqual(statistics.recorded, [[('HLS', True)]])
+
+    def test_not_started(self):
+        for concurrent_probing in [True, False]:
+            statistics = FakeStatistics()
+            session = FakeSession({None: ('INF', 0.05)})
+            factory = self._factory(session, concurrent_probing, statistics=statistics)
+            self.assertRaises(StreamHasNotStarted, factory.get_stream_strategy, RELATIVE_URL)
+            self.assertEqual(statistics.recorded, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
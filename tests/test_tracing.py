@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources', 'lib'))
+import tracing
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b''):
+        self.status_code = status_code
+        self.headers = {'Content-Length': str(len(body))}
+        self.request = None
+
+
+class TestTracing(unittest.TestCase):
+    def tearDown(self):
+        tracing.finish_trace()
+
+    def test_span_without_trace(self):
+        with tracing.span('nothing'):
+            pass
+        self.assertIsNone(tracing.finish_trace())
+
+    def test_nested_spans_and_responses(self):
+        tracing.start_trace('play')
+        with tracing.span('get_stream'):
+            with tracing.span('probe HLS'):
+                tracing.record_response(FakeResponse(200, b'abc'))
+        trace = tracing.finish_trace()
+        self.assertEqual(['play', 'get_stream', 'probe HLS'], [span['name'] for span in trace['spans']])
+        self.assertEqual([None, 0, 1], [span['parent'] for span in trace['spans']])
+        self.assertEqual([200], trace['spans'][2]['status'])
+        self.assertEqual(3, trace['spans'][2]['bytes_in'])
+
+    def test_exception_is_recorded(self):
+        tracing.start_trace('folder')
+        with self.assertRaises(ValueError):
+            with tracing.span('program'):
+                raise ValueError()
+        trace = tracing.finish_trace()
+        self.assertEqual('ValueError', trace['spans'][1]['error'])
+
+    def test_worker_thread_span_belongs_to_root(self):
+        tracing.start_trace('play')
+        with tracing.span('get_stream'):
+            thread = threading.Thread(target=tracing.traced('probe RTMP')(lambda: None))
+            thread.start()
+            thread.join()
+        trace = tracing.finish_trace()
+        probe = [span for span in trace['spans'] if span['name'] == 'probe RTMP'][0]
+        self.assertEqual(0, probe['parent'])
+
+    def test_trace_is_appended_to_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for name in ['root', 'folder']:
+                tracing.start_trace(name)
+                tracing.finish_trace(directory)
+            with open(os.path.join(directory, tracing.TRACE_FILENAME)) as f:
+                names = [json.loads(line)['name'] for line in f]
+            self.assertEqual(['root', 'folder'], names)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()